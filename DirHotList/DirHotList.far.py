@@ -1,15 +1,24 @@
-﻿import os
+﻿import time
+
+_import_start = time.perf_counter()
+
+import os
 import sys
 import enum
+import bisect
+import functools
+import hashlib
+import locale
 import logging
+import math
+import queue
+import re
+import struct
+import threading
 import uuid
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
-import win32con
 from typing import cast
-import yaml
-import yaml.parser
-import yaml.scanner
 
 import pygin
 from pygin import far
@@ -51,6 +60,47 @@ class Lng(enum.IntEnum):
     LogLevel = 13
     LogFileName = 14
 
+    Search = 15
+    SearchFooter = 16
+    SearchQuery = 17
+
+    MenuChanged = 18
+    Overwrite = 19
+
+    MostUsed = 20
+
+    Import = 21
+    ImportFile = 22
+    ImportResult = 23
+
+    Statistics = 24
+    StatisticsHeader = 25
+
+    SaveConflict = 26
+    SaveConflictHint = 27
+    SaveFailed = 28
+
+
+@enum.unique
+class VK(enum.IntEnum):
+    """
+    Коды виртуальных клавиш (вместо win32con, чтобы не загружать его при старте)
+    """
+    F2 = 0x71
+    F4 = 0x73
+    F5 = 0x74
+    Insert = 0x2D
+    Delete = 0x2E
+    Up = 0x26
+    Down = 0x28
+    Back = 0x08
+    Space = 0x20
+    KeyF = 0x46
+    OemMinus = 0xBD
+    OemPeriod = 0xBE
+    Oem2 = 0xBF  # /
+    Oem5 = 0xDC  # \
+
 
 @dataclass
 class MenuItem:
@@ -66,6 +116,16 @@ class GroupMenuItem(MenuItem):
     Группа элементов меню
     """
     items: list[MenuItem]
+    view: 'GroupView | None' = field(default=None, init=False, repr=False, compare=False)
+
+
+@dataclass
+class IncludeGroupMenuItem(GroupMenuItem):
+    """
+    Группа, элементы которой хранятся в отдельном файле и читаются при первом открытии группы
+    """
+    include: str = ''
+    loaded: bool = field(default=False, init=False, repr=False, compare=False)
 
 
 @dataclass
@@ -85,6 +145,1092 @@ class KeyItem:
     key: tuple[int, int]
 
 
+class EnvTemplate:
+    """
+    Строка, разобранная на литералы и ссылки на переменные окружения (%VAR%, ${VAR}, $VAR)
+    по правилам os.path.expandvars для Windows. Результат подстановки запоминается
+    и пересчитывается только при изменении значений использованных переменных.
+    Как и в ntpath.expandvars, после незакрытых ', % или ${ остаток строки не раскрывается
+    """
+    _token = re.compile(r"'[^']*(?:'|\Z)|%%|%([^%]+)%|%[^%]*\Z|\$\$|\$\{([^}]+)\}|\$\{[^}]*\Z|\$([\w-]+)",
+                        re.ASCII)
+    _templates: dict[str, 'EnvTemplate'] = {}
+
+    def __init__(self, text: str):
+        self.parts: list[str | tuple[str, str]] = []
+        position = 0
+        for match in self._token.finditer(text):
+            self.parts.append(text[position:match.start()])
+            name = match.group(1) or match.group(2) or match.group(3)
+            if name is not None:
+                self.parts.append((name, match.group()))
+            else:
+                token = match.group()
+                self.parts.append(token[0] if token in ('%%', '$$') else token)
+            position = match.end()
+        self.parts.append(text[position:])
+        self.names = tuple(part[0] for part in self.parts if type(part) is tuple)
+        self.values = None
+        self.result = ''.join(self.parts) if not self.names else None
+
+    @classmethod
+    def get(cls, text: str) -> 'EnvTemplate':
+        template = cls._templates.get(text)
+        if template is None:
+            template = cls._templates[text] = cls(text)
+            if MethodTrace.enabled:
+                template.verify(text)
+        return template
+
+    def verify(self, text: str) -> None:
+        """
+        Сверяет подстановку с ntpath.expandvars и пишет в лог расхождение.
+        Вызывается при включенном отладочном логировании
+
+        :param text: Исходная строка
+        """
+        import ntpath
+        expected = ntpath.expandvars(text)
+        if self.render() != expected:
+            logging.warning(f"Template {text!r} is expanded as {self.render()!r}, expected {expected!r}")
+
+    def render(self) -> str:
+        if not self.names:
+            return self.result
+        values = tuple(os.environ.get(name) for name in self.names)
+        if values != self.values:
+            self.values = values
+            self.result = ''.join(
+                part if type(part) is str else os.environ.get(part[0], part[1]) for part in self.parts)
+        return self.result
+
+
+@dataclass(eq=False)
+class GroupView:
+    """
+    Отрисованные элементы меню группы. Сбрасываются при изменении группы
+    или значений использованных в именах переменных окружения
+    """
+    guid: uuid.UUID = field(default_factory=uuid.uuid4)
+    items: list[far.MenuItem] | None = None
+    templates: list[tuple[EnvTemplate, str]] = field(default_factory=list)
+    selected: int | None = None
+
+    def valid(self) -> bool:
+        return self.items is not None and all(template.render() == text for template, text in self.templates)
+
+    def invalidate(self) -> None:
+        self.items = None
+        self.templates = []
+        self.selected = None
+
+    def select(self, item_id: int | None) -> list[far.MenuItem]:
+        """
+        Переносит выделение на элемент
+
+        :param item_id: Идентификатор выделенного элемента
+        :return: Список элементов
+        """
+        if self.selected is not None:
+            self.items[self.selected].Flags &= ~far.MenuItemFlags.Selected
+        if item_id is not None and 0 <= item_id < len(self.items):
+            self.items[item_id].Flags |= far.MenuItemFlags.Selected
+        else:
+            item_id = None
+        self.selected = item_id
+        return self.items
+
+
+def expandvars(text: str) -> str:
+    """
+    Подставляет значения переменных окружения, используя кэш разобранных строк
+
+    :param text: Строка с переменными окружения
+    :return: Строка с подставленными значениями
+    """
+    return EnvTemplate.get(text).render()
+
+
+@dataclass(eq=False)
+class SearchEntry:
+    """
+    Ссылка в индексе поиска
+    """
+    item: ShortcutMenuItem
+    path: tuple[str, ...]
+    text: str
+
+    @property
+    def display(self) -> str:
+        return ' > '.join(self.path + (expandvars(self.item.name),))
+
+
+class SearchIndex:
+    """
+    Триграммный индекс ссылок всего дерева для поиска по подстроке.
+    Индексируются имя, ссылка (как есть и с раскрытыми переменными окружения) и путь групп.
+    Строится после загрузки меню и обновляется при изменениях отдельных элементов
+    """
+
+    def __init__(self):
+        self.entries: dict[int, SearchEntry] = {}
+        self.grams: dict[str, set[int]] = {}
+        self.paths: dict[int, tuple[str, ...]] = {}
+        self.version = 0
+        self.last: tuple[int, str, list[int]] | None = None
+
+    @staticmethod
+    def _trigrams(text: str) -> set[str]:
+        return {text[i:i + 3] for i in range(len(text) - 2)}
+
+    @staticmethod
+    def _text(item: ShortcutMenuItem, path: tuple[str, ...]) -> str:
+        fields = [item.name, expandvars(item.name)]
+        if item.shortcut is not None:
+            fields += [item.shortcut, expandvars(item.shortcut)]
+        fields += path
+        return '\n'.join(fields).casefold()
+
+    def build(self, root: GroupMenuItem) -> None:
+        # результаты предыдущего поиска относятся к старому дереву, даже если новое пусто
+        self.version += 1
+        self.last = None
+        self.entries.clear()
+        self.grams.clear()
+        self.paths = {id(root): ()}
+        for item in root.items:
+            self.add(root, item)
+
+    def add(self, group: GroupMenuItem, item: MenuItem) -> None:
+        """
+        Добавляет элемент со всеми вложенными элементами
+        """
+        self.version += 1
+        path = self.paths[id(group)]
+        match item:
+            case GroupMenuItem():
+                self.paths[id(item)] = path + (item.name,)
+                for child in item.items:
+                    self.add(item, child)
+            case ShortcutMenuItem():
+                entry = SearchEntry(item, path, self._text(item, path))
+                self.entries[id(item)] = entry
+                for gram in self._trigrams(entry.text):
+                    self.grams.setdefault(gram, set()).add(id(item))
+
+    def remove(self, item: MenuItem) -> None:
+        """
+        Удаляет элемент со всеми вложенными элементами
+        """
+        self.version += 1
+        match item:
+            case GroupMenuItem():
+                self.paths.pop(id(item), None)
+                for child in item.items:
+                    self.remove(child)
+            case ShortcutMenuItem():
+                entry = self.entries.pop(id(item), None)
+                if entry is not None:
+                    for gram in self._trigrams(entry.text):
+                        keys = self.grams.get(gram)
+                        if keys is not None:
+                            keys.discard(id(item))
+                            if not keys:
+                                del self.grams[gram]
+
+    def update(self, group: GroupMenuItem, item: MenuItem) -> None:
+        """
+        Переиндексирует измененный элемент
+        """
+        self.remove(item)
+        self.add(group, item)
+
+    def search(self, query: str, limit: int = 1000) -> list[SearchEntry]:
+        """
+        Ищет ссылки, содержащие строку
+
+        :param query: Строка поиска, регистр не учитывается
+        :param limit: Максимальное количество результатов
+        :return: Найденные ссылки, упорядоченные по пути
+        """
+        query = query.casefold()
+        if self.last is not None and self.last[0] == self.version and query.startswith(self.last[1]):
+            # уточнение предыдущего запроса: достаточно отфильтровать его результаты
+            candidates = self.last[2]
+        elif len(query) >= 3:
+            keys = sorted((self.grams.get(gram, set()) for gram in self._trigrams(query)), key=len)
+            candidates = set.intersection(*keys) if keys else set()
+        else:
+            candidates = self.entries.keys()
+        found = [key for key in candidates if query in self.entries[key].text]
+        self.last = (self.version, query, found)
+        entries = sorted((self.entries[key] for key in found),
+                         key=lambda entry: (entry.path, entry.item.name.casefold()))
+        return entries[:limit]
+
+
+class PathIndex:
+    """
+    Плоский индекс дерева меню: путь группы -> группа, нормализованный каталог ссылки -> ссылки,
+    элемент -> родительская группа. Поддерживается в актуальном состоянии при изменениях дерева
+    """
+
+    def __init__(self):
+        self.groups: dict[tuple[str, ...], GroupMenuItem] = {}
+        self.directories: dict[str, list[ShortcutMenuItem]] = {}
+        self.parents: dict[int, GroupMenuItem] = {}
+        self.paths: dict[int, tuple[str, ...]] = {}
+        self.keys: dict[int, str] = {}
+
+    @staticmethod
+    def normalize(directory: str) -> str:
+        """
+        Приводит каталог к виду для сравнения
+
+        :param directory: Каталог, может содержать переменные окружения
+        :return: Нормализованный каталог
+        """
+        return os.path.normcase(os.path.normpath(expandvars(directory)))
+
+    def build(self, root: GroupMenuItem) -> None:
+        self.groups = {(): root}
+        self.directories.clear()
+        self.parents.clear()
+        self.keys.clear()
+        self.paths = {id(root): ()}
+        for item in root.items:
+            self.add(root, item)
+
+    def add(self, group: GroupMenuItem, item: MenuItem) -> None:
+        """
+        Добавляет элемент со всеми вложенными элементами
+        """
+        self.parents[id(item)] = group
+        match item:
+            case GroupMenuItem():
+                path = self.paths[id(group)] + (item.name,)
+                self.paths[id(item)] = path
+                self.groups.setdefault(path, item)
+                for child in item.items:
+                    self.add(item, child)
+            case ShortcutMenuItem():
+                key = self.normalize(item.name if item.shortcut is None else item.shortcut)
+                self.keys[id(item)] = key
+                self.directories.setdefault(key, []).append(item)
+
+    def remove(self, item: MenuItem) -> None:
+        """
+        Удаляет элемент со всеми вложенными элементами
+        """
+        self.parents.pop(id(item), None)
+        match item:
+            case GroupMenuItem():
+                path = self.paths.pop(id(item), None)
+                if self.groups.get(path) is item:
+                    del self.groups[path]
+                for child in item.items:
+                    self.remove(child)
+            case ShortcutMenuItem():
+                key = self.keys.pop(id(item), None)
+                items = self.directories.get(key)
+                if items is not None:
+                    items[:] = [value for value in items if value is not item]
+                    if not items:
+                        del self.directories[key]
+
+    def update(self, group: GroupMenuItem, item: MenuItem) -> None:
+        """
+        Переиндексирует измененный элемент
+        """
+        self.remove(item)
+        self.add(group, item)
+
+    def group(self, path: tuple[str, ...]) -> GroupMenuItem | None:
+        return self.groups.get(tuple(path))
+
+    def find(self, directory: str) -> list[ShortcutMenuItem]:
+        """
+        Ищет ссылки на каталог
+
+        :param directory: Каталог
+        :return: Список ссылок
+        """
+        return self.directories.get(self.normalize(directory), [])
+
+    def parent(self, item: MenuItem) -> GroupMenuItem | None:
+        return self.parents.get(id(item))
+
+    def path(self, item: MenuItem) -> tuple[str, ...]:
+        """
+        Путь групп до элемента
+        """
+        parent = self.parent(item)
+        return () if parent is None else self.paths[id(parent)]
+
+
+class Yaml:
+    """
+    Отложенная загрузка PyYAML. Использует C-реализацию (libyaml), если PyYAML собран с ней
+    """
+    module = None
+    Loader = None
+    Dumper = None
+
+    @classmethod
+    def get(cls):
+        if cls.module is None:
+            import yaml
+            cls.Loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+            cls.Dumper = getattr(yaml, 'CSafeDumper', yaml.SafeDumper)
+            cls.Dumper.add_representer(
+                type(None),
+                lambda dumper, value: dumper.represent_scalar(u'tag:yaml.org,2002:null', '')
+            )
+            cls.module = yaml
+        return cls
+
+    @classmethod
+    def load(cls, stream):
+        return cls.module.load(stream, Loader=cls.Loader)
+
+    @classmethod
+    def dump(cls, data, stream) -> None:
+        cls.module.dump(data, stream, Dumper=cls.Dumper, encoding='utf-8', allow_unicode=True)
+
+
+class MenuSnapshot:
+    """
+    Двоичный снимок разобранного дерева меню, хранится рядом с файлом меню.
+    Действителен, пока у файла меню не изменились размер и время изменения,
+    либо, если они изменились, хэш содержимого.
+
+    Формат: заголовок (сигнатура, размер, время изменения, хэш файла меню),
+    затем элементы в прямом порядке обхода: тип, имя и ссылка, имя включаемого файла
+    или число элементов группы.
+    """
+    signature = b'DHLS\x02'
+    header = struct.Struct('<5sQq16s')
+    kind = struct.Struct('<B')
+    length = struct.Struct('<I')
+    kind_group, kind_shortcut, kind_name_only, kind_include = range(4)
+
+    def __init__(self, menu_file: str):
+        self.menu_file = menu_file
+        self.snapshot_file = menu_file + '.snapshot'
+        self.data = None
+        self.stat = None
+        self.digest = None
+
+    @staticmethod
+    def _digest(data: bytes) -> bytes:
+        return hashlib.blake2b(data, digest_size=16).digest()
+
+    def load(self) -> list[MenuItem] | None:
+        """
+        Загружает дерево из снимка
+
+        :return: Элементы корневой группы или None, если снимка нет или он устарел.
+                 Во втором случае прочитанное содержимое файла меню остается в data
+        """
+        self.stat = os.stat(self.menu_file)
+        try:
+            with open(self.snapshot_file, 'rb') as snapshot_file:
+                snapshot = snapshot_file.read()
+            signature, size, mtime, digest = self.header.unpack_from(snapshot)
+        except (OSError, struct.error):
+            snapshot = None
+            signature = size = mtime = digest = None
+        if signature == self.signature and (size, mtime) == (self.stat.st_size, self.stat.st_mtime_ns):
+            self.digest = digest
+        else:
+            self._read_menu()
+            if signature != self.signature or digest != self.digest:
+                return None
+        try:
+            items, offset = self._decode(snapshot, self.header.size, 1)
+        except (struct.error, UnicodeDecodeError, ValueError):
+            self._read_menu()
+            return None
+        if size != self.stat.st_size or mtime != self.stat.st_mtime_ns:
+            try:
+                self._write(snapshot[self.header.size:])
+            except OSError as e:
+                logging.warning(f"Snapshot {self.snapshot_file} is not refreshed: {e}")
+        return items[0].items
+
+    def _read_menu(self) -> None:
+        if self.data is None:
+            with open(self.menu_file, 'rb') as menu_file:
+                self.data = menu_file.read()
+            self.digest = self._digest(self.data)
+
+    def encode(self, items: list[MenuItem]) -> bytes | None:
+        """
+        Кодирует дерево
+
+        :param items: Элементы корневой группы
+        :return: Тело снимка или None, если дерево не может быть закодировано
+        """
+        body = bytearray()
+        try:
+            self._encode(GroupMenuItem('\\', items), body)
+        except (TypeError, AttributeError) as e:
+            logging.warning(f"Snapshot {self.snapshot_file} is not saved: {e}")
+            return None
+        return bytes(body)
+
+    def save(self, items: list[MenuItem]) -> None:
+        """
+        Записывает снимок дерева для текущего состояния файла меню
+
+        :param items: Элементы корневой группы
+        :return:
+        """
+        self.store(self.encode(items))
+
+    def store(self, body: bytes | None) -> None:
+        """
+        Записывает закодированный снимок для текущего состояния файла меню
+
+        :param body: Тело снимка
+        :return:
+        """
+        if body is None:
+            return
+        try:
+            stat = os.stat(self.menu_file)
+            if self.digest is None or self.stat is None or \
+                    (stat.st_size, stat.st_mtime_ns) != (self.stat.st_size, self.stat.st_mtime_ns):
+                with open(self.menu_file, 'rb') as menu_file:
+                    self.digest = self._digest(menu_file.read())
+            self.stat = stat
+            self._write(body)
+        except OSError as e:
+            logging.warning(f"Snapshot {self.snapshot_file} is not saved: {e}")
+
+    def _write(self, body: bytes) -> None:
+        temp_file = self.snapshot_file + '.tmp'
+        try:
+            with open(temp_file, 'wb') as snapshot_file:
+                snapshot_file.write(self.header.pack(self.signature, self.stat.st_size, self.stat.st_mtime_ns, self.digest))
+                snapshot_file.write(body)
+            os.replace(temp_file, self.snapshot_file)
+        except OSError:
+            try:
+                os.remove(temp_file)
+            except OSError:
+                pass
+            raise
+
+    def _encode_str(self, value: str, body: bytearray) -> None:
+        data = value.encode('utf-8')
+        body += self.length.pack(len(data))
+        body += data
+
+    def _encode(self, item: MenuItem, body: bytearray) -> None:
+        match item:
+            case IncludeGroupMenuItem():
+                body += self.kind.pack(self.kind_include)
+                self._encode_str(item.name, body)
+                self._encode_str(item.include, body)
+            case GroupMenuItem():
+                body += self.kind.pack(self.kind_group)
+                self._encode_str(item.name, body)
+                body += self.length.pack(len(item.items))
+                for child in item.items:
+                    self._encode(child, body)
+            case ShortcutMenuItem() if item.shortcut is None:
+                body += self.kind.pack(self.kind_name_only)
+                self._encode_str(item.name, body)
+            case ShortcutMenuItem():
+                body += self.kind.pack(self.kind_shortcut)
+                self._encode_str(item.name, body)
+                self._encode_str(item.shortcut, body)
+
+    def _decode_str(self, data: bytes, offset: int) -> tuple[str, int]:
+        (size,) = self.length.unpack_from(data, offset)
+        offset += self.length.size
+        if offset + size > len(data):
+            raise ValueError("Truncated snapshot")
+        return data[offset:offset + size].decode('utf-8'), offset + size
+
+    def _decode(self, data: bytes, offset: int, count: int) -> tuple[list[MenuItem], int]:
+        items = []
+        for _ in range(count):
+            (kind,) = self.kind.unpack_from(data, offset)
+            name, offset = self._decode_str(data, offset + self.kind.size)
+            if kind == self.kind_group:
+                (size,) = self.length.unpack_from(data, offset)
+                children, offset = self._decode(data, offset + self.length.size, size)
+                items.append(GroupMenuItem(name, children))
+            elif kind == self.kind_shortcut:
+                shortcut, offset = self._decode_str(data, offset)
+                items.append(ShortcutMenuItem(name, shortcut))
+            elif kind == self.kind_name_only:
+                items.append(ShortcutMenuItem(name, None))
+            elif kind == self.kind_include:
+                include, offset = self._decode_str(data, offset)
+                items.append(IncludeGroupMenuItem(name, [], include))
+            else:
+                raise ValueError(f"Unknown snapshot item kind {kind}")
+        return items, offset
+
+
+@dataclass
+class SaveJob:
+    """
+    Содержимое файла меню, подготовленное к записи
+    """
+    menu_file: str
+    data: list
+    snapshot: bytes | None
+    force: bool = False
+
+
+def file_version(file_name: str) -> tuple[int, int] | None:
+    """
+    Версия файла для обнаружения изменений другими программами
+
+    :param file_name: Имя файла
+    :return: Размер и время изменения или None, если файла нет
+    """
+    try:
+        stat = os.stat(file_name)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+class SaveScheduler:
+    """
+    Отложенная запись файлов меню.
+    Группы, измененные в течение delay секунд после первого изменения, отмечаются как измененные.
+    Содержимое файлов готовится один раз на всю серию в основном потоке (через synchro),
+    а записывается в фоновом потоке. Записи выполняются строго по очереди, более старое
+    содержимое файла не записывается поверх более нового
+    """
+
+    def __init__(self, build, write, synchro, delay: float = 1.0):
+        self.build = build
+        self.write = write
+        self.synchro = synchro
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.write_lock = threading.Lock()
+        self.pending: dict[int, object] = {}
+        self.timer: threading.Timer | None = None
+        self.sequence = 0
+        self.written: dict[str, int] = {}
+
+    def schedule(self, owner) -> None:
+        """
+        Отмечает файл группы как измененный
+
+        :param owner: Группа, в файле которой хранятся изменения
+        """
+        with self.lock:
+            self.pending[id(owner)] = owner
+            if self.timer is None:
+                self.timer = threading.Timer(self.delay, self.synchro, (self._dispatch,))
+                self.timer.daemon = True
+                self.timer.start()
+
+    def _take(self) -> list[tuple[int, SaveJob]]:
+        with self.lock:
+            owners, self.pending = list(self.pending.values()), {}
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+        jobs = []
+        for owner in owners:
+            self.sequence += 1
+            jobs.append((self.sequence, self.build(owner)))
+        return jobs
+
+    def _dispatch(self) -> None:
+        # основной поток: готовит содержимое и отдает его на запись фоновому потоку
+        jobs = self._take()
+        if jobs:
+            threading.Thread(target=self._write, args=(jobs,), name='DirHotList save', daemon=True).start()
+
+    def _write(self, jobs: list[tuple[int, SaveJob]]) -> None:
+        with self.write_lock:
+            for sequence, job in jobs:
+                if sequence > self.written.get(job.menu_file, 0):
+                    self.written[job.menu_file] = sequence
+                    self.write(job)
+
+    def flush(self, job: SaveJob | None = None) -> None:
+        """
+        Немедленно записывает отложенные изменения и дожидается окончания текущей записи.
+        Вызывается в основном потоке
+
+        :param job: Более новое содержимое одного из файлов, заменяющее отложенное
+        """
+        jobs = self._take()
+        if job is not None:
+            self.sequence += 1
+            jobs = [pending for pending in jobs if pending[1].menu_file != job.menu_file] + [(self.sequence, job)]
+        self._write(jobs)
+
+
+class ReachabilityChecker:
+    """
+    Фоновая проверка доступности каталогов ссылок.
+    Проверки выполняются пулом из workers потоков; каталог, не ответивший за timeout секунд
+    с начала проверки, считается недоступным и не проверяется повторно, пока зависшая проверка
+    не завершится. Пока проверка ждет свободного потока, результат неизвестен.
+    Результаты хранятся ttl секунд. Об изменившихся результатах
+    сообщается функции notify из рабочего потока, один раз до вызова changes()
+    """
+
+    def __init__(self, notify, workers: int = 4, timeout: float = 2.0, ttl: float = 60.0):
+        self.notify = notify
+        self.workers = workers
+        self.timeout = timeout
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.executor = None
+        self.results: dict[str, tuple[bool, float]] = {}
+        self.pending: set[str] = set()
+        self.hanging: set[str] = set()
+        self.changed: set[str] = set()
+        self.closed = False
+
+    def reachable(self, directory: str) -> bool | None:
+        """
+        Результат последней проверки
+
+        :param directory: Нормализованный каталог
+        :return: Доступность каталога или None, если он не проверялся
+        """
+        result = self.results.get(directory)
+        return None if result is None else result[0]
+
+    def check(self, directories) -> None:
+        """
+        Ставит в очередь проверку каталогов, для которых нет свежего результата
+
+        :param directories: Нормализованные каталоги
+        """
+        now = time.monotonic()
+        with self.lock:
+            if self.closed:
+                return
+            for directory in directories:
+                if not os.path.isabs(directory) or directory in self.pending:
+                    continue
+                result = self.results.get(directory)
+                if result is not None and now - result[1] < self.ttl:
+                    continue
+                if self.executor is None:
+                    from concurrent.futures import ThreadPoolExecutor
+                    self.executor = ThreadPoolExecutor(max_workers=self.workers,
+                                                       thread_name_prefix='DirHotList reachability')
+                self.pending.add(directory)
+                self.executor.submit(self._probe, directory)
+
+    def changes(self) -> set[str]:
+        """
+        Забирает каталоги, доступность которых изменилась после предыдущего вызова
+        """
+        with self.lock:
+            changed, self.changed = self.changed, set()
+        return changed
+
+    def close(self) -> None:
+        with self.lock:
+            self.closed = True
+            self.pending.clear()
+            if self.executor is not None:
+                self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def _probe(self, directory: str) -> None:
+        # Обращение к отключенному сетевому ресурсу может ждать ответа Windows десятки секунд.
+        # Таймер отсчитывает timeout с начала проверки и отмечает каталог недоступным,
+        # а сама проверка остается в pending до возврата из isdir
+        if self.closed:
+            return
+        timer = threading.Timer(self.timeout, self._expired, (directory,))
+        timer.daemon = True
+        timer.start()
+        try:
+            reachable = os.path.isdir(directory)
+        finally:
+            timer.cancel()
+            with self.lock:
+                self.pending.discard(directory)
+                self.hanging.discard(directory)
+        self._record(directory, reachable)
+
+    def _expired(self, directory: str) -> None:
+        with self.lock:
+            if directory not in self.pending:
+                return
+            self.hanging.add(directory)
+        self._record(directory, False)
+
+    def _record(self, directory: str, reachable: bool) -> None:
+        with self.lock:
+            if self.closed:
+                return
+            previous = self.results.get(directory)
+            self.results[directory] = (reachable, time.monotonic())
+            if previous is not None and previous[0] == reachable:
+                return
+            notify = not self.changed
+            self.changed.add(directory)
+        if notify:
+            self.notify()
+
+
+class UsageStats:
+    """
+    Статистика переходов по каталогам: число переходов, время последнего перехода и ранг.
+    Вес перехода убывает вдвое за half_life секунд. Ранг - это логарифм суммарного веса,
+    приведенный к нулевому моменту времени, поэтому ранги не меняются со временем,
+    и упорядоченный список пересчитывается только для каталога, по которому был переход.
+
+    Формат файла: сигнатура, затем записи (число переходов, время, ранг, длина ключа, ключ)
+    """
+    signature = b'DHLU\x01'
+    entry = struct.Struct('<IddI')
+
+    def __init__(self, usage_file: str, half_life: float = 14 * 24 * 3600):
+        self.usage_file = usage_file
+        self.half_life = half_life
+        self.entries: dict[str, tuple[int, float, float]] = {}
+        self.ranking: list[tuple[float, str]] = []
+
+    def load(self) -> None:
+        self.entries.clear()
+        try:
+            with open(self.usage_file, 'rb') as usage_file:
+                data = usage_file.read()
+            if data.startswith(self.signature):
+                offset = len(self.signature)
+                while offset < len(data):
+                    count, last, rank, length = self.entry.unpack_from(data, offset)
+                    offset += self.entry.size
+                    key = data[offset:offset + length].decode('utf-8')
+                    offset += length
+                    self.entries[key] = (count, last, rank)
+        except (OSError, struct.error, UnicodeDecodeError) as e:
+            logging.warning(f"Usage file {self.usage_file} is not loaded: {e}")
+        self.ranking = sorted((-rank, key) for key, (count, last, rank) in self.entries.items())
+
+    def save(self) -> None:
+        body = bytearray(self.signature)
+        for key, (count, last, rank) in self.entries.items():
+            encoded = key.encode('utf-8')
+            body += self.entry.pack(count, last, rank, len(encoded))
+            body += encoded
+        temp_file = self.usage_file + '.tmp'
+        try:
+            with open(temp_file, 'wb') as usage_file:
+                usage_file.write(body)
+            os.replace(temp_file, self.usage_file)
+        except OSError as e:
+            logging.warning(f"Usage file {self.usage_file} is not saved: {e}")
+
+    def record(self, key: str, now: float | None = None) -> None:
+        """
+        Учитывает переход по каталогу
+
+        :param key: Нормализованный каталог
+        :param now: Время перехода
+        """
+        now = time.time() if now is None else now
+        count, last, rank = self.entries.get(key, (0, now, -math.inf))
+        if rank != -math.inf:
+            self.ranking.pop(bisect.bisect_left(self.ranking, (-rank, key)))
+        # ранг = log2(вес в момент now) + now / half_life
+        rank = math.log2(2 ** (rank - now / self.half_life) + 1) + now / self.half_life
+        self.entries[key] = (count + 1, now, rank)
+        bisect.insort(self.ranking, (-rank, key))
+
+    def top(self):
+        """
+        Каталоги в порядке убывания ранга
+        """
+        return (key for _, key in self.ranking)
+
+
+def build_menu_items(items: list) -> list[MenuItem]:
+    """
+    Строит элементы меню из прочитанной структуры YAML
+
+    :param items: Список словарей
+    :return: Элементы группы
+    """
+    result = []
+    for item in items:
+        key, value = item.popitem()
+        if type(value) is list:
+            result.append(GroupMenuItem(key, build_menu_items(value)))
+        elif type(value) is dict:
+            result.append(IncludeGroupMenuItem(key, [], value.get('include', '')))
+        else:
+            result.append(ShortcutMenuItem(key, value if value else None))
+    return result
+
+
+def open_import(file_name: str):
+    """
+    Открывает текстовый файл для импорта. Кодировка определяется по BOM,
+    без BOM - UTF-8, если начало файла в ней читается, иначе кодировка ANSI
+
+    :param file_name: Имя файла
+    :return: Открытый файл
+    """
+    with open(file_name, 'rb') as import_file:
+        head = import_file.read(65536)
+    if head.startswith((b'\xff\xfe', b'\xfe\xff')):
+        encoding = 'utf-16'
+    elif head.startswith(b'\xef\xbb\xbf'):
+        encoding = 'utf-8-sig'
+    else:
+        try:
+            head.decode('utf-8')
+            encoding = 'utf-8'
+        except UnicodeDecodeError as e:
+            # начало файла могло оборваться на середине символа
+            encoding = 'utf-8' if e.start >= len(head) - 3 else locale.getpreferredencoding(False)
+    return open(file_name, 'r', encoding=encoding, errors='replace')
+
+
+def import_tc_dirmenu(lines):
+    """
+    Элементы меню из секции [DirMenu] файла wincmd.ini Total Commander.
+    Подменю начинается пунктом "-Имя" и заканчивается пунктом "--", пункт "-" - разделитель.
+    Учитываются только команды cd
+
+    :param lines: Строки файла
+    :return: Генератор элементов верхнего уровня
+    """
+    in_section = False
+    stack: list[GroupMenuItem] = []
+    pending: ShortcutMenuItem | None = None
+
+    def flush():
+        if pending is not None and pending.shortcut:
+            if stack:
+                stack[-1].items.append(pending)
+            else:
+                return pending
+        return None
+
+    for line in lines:
+        line = line.strip()
+        if line.startswith('['):
+            in_section = line.lower() == '[dirmenu]'
+            continue
+        if not in_section or '=' not in line:
+            continue
+        key, value = line.split('=', 1)
+        key = key.strip().lower()
+        if key.startswith('menu'):
+            if (item := flush()) is not None:
+                yield item
+            pending = None
+            if value == '--':
+                if stack:
+                    group = stack.pop()
+                    if not stack:
+                        yield group
+                    else:
+                        stack[-1].items.append(group)
+            elif value.startswith('-'):
+                if value != '-':
+                    stack.append(GroupMenuItem(value[1:], []))
+            else:
+                pending = ShortcutMenuItem(value.replace('&', ''), None)
+        elif key.startswith('cmd') and pending is not None:
+            command = value.strip()
+            if command[:3].lower() == 'cd ':
+                pending.shortcut = command[3:].strip().strip('"')
+    if (item := flush()) is not None:
+        yield item
+    while stack:
+        group = stack.pop()
+        if not stack:
+            yield group
+        else:
+            stack[-1].items.append(group)
+
+
+def import_far_config(file_name: str):
+    """
+    Ссылки на папки из экспорта настроек Far 3 (far.exe -export): значения Data/Name
+    внутри ключа FolderShortcuts (Shortcuts)
+
+    :param file_name: Имя файла
+    :return: Генератор ссылок
+    """
+    # модуль нужен только при импорте, не загружаем его при запуске Far
+    import xml.etree.ElementTree as ElementTree
+    names: list[str] = []
+    for event, element in ElementTree.iterparse(file_name, events=('start', 'end')):
+        if element.tag != 'key':
+            continue
+        if event == 'start':
+            names.append(element.get('name', ''))
+            continue
+        if any('shortcuts' in name.lower() for name in names):
+            values = {value.get('name', ''): value.get('value', '') for value in element.findall('value')}
+            for name, data in values.items():
+                if name.startswith('Data') and data:
+                    description = values.get('Name' + name[4:])
+                    yield ShortcutMenuItem(description, data) if description else ShortcutMenuItem(data, None)
+        names.pop()
+        element.clear()
+
+
+def import_far_reg(lines):
+    """
+    Ссылки на папки из экспорта реестра Far 2: значения "ShortcutN" ключа FolderShortcuts
+
+    :param lines: Строки файла
+    :return: Генератор ссылок
+    """
+    in_section = False
+    value_re = re.compile(r'^"Shortcut\d+"="(.*)"$', re.IGNORECASE)
+    for line in lines:
+        line = line.strip()
+        if line.startswith('['):
+            in_section = line.lower().endswith('\\foldershortcuts]')
+        elif in_section and (match := value_re.match(line)):
+            directory = match.group(1).replace('\\\\', '\\').replace('\\"', '"')
+            if directory:
+                yield ShortcutMenuItem(directory, None)
+
+
+def import_text(lines):
+    """
+    Ссылки из текстового списка: по одному каталогу в строке, либо "описание<TAB>каталог".
+    Пустые строки и строки, начинающиеся с #, пропускаются
+
+    :param lines: Строки файла
+    :return: Генератор ссылок
+    """
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        if '\t' in line:
+            name, directory = line.split('\t', 1)
+            yield ShortcutMenuItem(name.strip(), directory.strip())
+        else:
+            yield ShortcutMenuItem(line, None)
+
+
+def count_shortcuts(item: MenuItem) -> int:
+    """
+    Число ссылок в элементе и всех вложенных элементах
+    """
+    if isinstance(item, GroupMenuItem):
+        return sum(count_shortcuts(child) for child in item.items)
+    return 1
+
+
+def import_items(file_name: str):
+    """
+    Читает элементы меню из внешнего списка, формат определяется по расширению файла:
+    .ini - Total Commander, .farconfig и .xml - Far 3, .reg - Far 2, остальные - текстовый список
+
+    :param file_name: Имя файла
+    :return: Генератор элементов верхнего уровня
+    """
+    extension = os.path.splitext(file_name)[1].lower()
+    if extension in ('.farconfig', '.xml'):
+        yield from import_far_config(file_name)
+        return
+    parser = {'.ini': import_tc_dirmenu, '.reg': import_far_reg}.get(extension, import_text)
+    with open_import(file_name) as lines:
+        yield from parser(lines)
+
+
+def menu_data(menu_items: list[MenuItem]) -> list:
+    """
+    Преобразует элементы меню в структуру для записи в YAML
+
+    :param menu_items: Элементы группы
+    :return: Список словарей
+    """
+    items = []
+    for menu_item in menu_items:
+        match menu_item:
+            case IncludeGroupMenuItem():
+                items.append({menu_item.name: {'include': cast(IncludeGroupMenuItem, menu_item).include}})
+            case GroupMenuItem():
+                items.append({menu_item.name: menu_data(cast(GroupMenuItem, menu_item).items)})
+            case ShortcutMenuItem():
+                items.append({menu_item.name: cast(ShortcutMenuItem, menu_item).shortcut})
+    return items
+
+
+class MethodTrace:
+    """
+    Трассировка методов, отмеченных декоратором add_log.
+    Пока отладочное логирование выключено, в классе остаются исходные функции и вызовы ничего не стоят.
+    При включенном - функции заменяются обертками, которые пишут вызовы в лог
+    и собирают статистику времени выполнения: число вызовов, общее и максимальное время
+    """
+    methods: list[tuple[type, str, object]] = []
+    stats: dict[str, list] = {}
+    enabled = False
+
+    class Method:
+        def __init__(self, func):
+            self.func = func
+
+        def __set_name__(self, owner, name):
+            MethodTrace.methods.append((owner, name, self.func))
+            setattr(owner, name, self.func)
+
+    @classmethod
+    def configure(cls, enabled: bool) -> None:
+        """
+        Подставляет в классы обертки или исходные функции
+
+        :param enabled: Трассировка включена
+        """
+        if enabled == cls.enabled:
+            return
+        cls.enabled = enabled
+        for owner, name, func in cls.methods:
+            setattr(owner, name, cls._wrap(func) if enabled else func)
+
+    @classmethod
+    def _wrap(cls, func):
+        stats = cls.stats.setdefault(func.__name__, [0, 0.0, 0.0])
+
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            logging.debug(f"Function: {func.__name__}")
+            start = time.perf_counter()
+            try:
+                exit_code = func(self, *args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                stats[0] += 1
+                stats[1] += elapsed
+                stats[2] = max(stats[2], elapsed)
+            logging.debug(f"Exit code '{func.__name__}': {exit_code}")
+            return exit_code
+
+        return wrapper
+
+    @classmethod
+    def report(cls) -> list[str]:
+        """
+        Статистика вызовов в порядке убывания общего времени, время в миллисекундах
+        """
+        return [f"{name:<24}{count:>8}{total * 1000:>12.1f}{maximum * 1000:>10.1f}"
+                for name, (count, total, maximum) in sorted(cls.stats.items(), key=lambda item: -item[1][1])
+                if count]
+
+
 class DirHotListPlugin(pygin.Plugin):
     """
     DirHotList plugin
@@ -99,16 +1245,30 @@ class DirHotListPlugin(pygin.Plugin):
     cHGroup = cHistoryPrefix + 'Group'
     cHDirectory = cHistoryPrefix + 'Directory'
     cHDescription = cHistoryPrefix + 'Description'
+    cHImport = cHistoryPrefix + 'Import'
 
     menu_keys = (
-        KeyItem('Edit', (win32con.VK_F4, 0)),
-        KeyItem('Insert', (win32con.VK_INSERT, 0)),
-        KeyItem('Delete', (win32con.VK_DELETE, 0)),
-        KeyItem('MoveUp', (win32con.VK_UP, 8)),  # LEFT_CTRL_PRESSED
-        KeyItem('MoveDown', (win32con.VK_DOWN, 8)),  # LEFT_CTRL_PRESSED
-        KeyItem('Update', (win32con.VK_F5, 0)),
-        KeyItem('Save', (win32con.VK_F2, 0)),
-        KeyItem('MenuEdit', (win32con.VK_F4, 2)),  # LEFT_ALT_PRESSED
+        KeyItem('Edit', (VK.F4, 0)),
+        KeyItem('Insert', (VK.Insert, 0)),
+        KeyItem('Delete', (VK.Delete, 0)),
+        KeyItem('MoveUp', (VK.Up, 8)),  # LEFT_CTRL_PRESSED
+        KeyItem('MoveDown', (VK.Down, 8)),  # LEFT_CTRL_PRESSED
+        KeyItem('Update', (VK.F5, 0)),
+        KeyItem('Save', (VK.F2, 0)),
+        KeyItem('MenuEdit', (VK.F4, 2)),  # LEFT_ALT_PRESSED
+        KeyItem('Search', (VK.KeyF, 8)),  # LEFT_CTRL_PRESSED
+        KeyItem('Import', (VK.Insert, 2)),  # LEFT_ALT_PRESSED
+    )
+
+    # Клавиши, набирающие строку поиска: (код клавиши, символ)
+    search_chars = tuple(
+        [(code, chr(code).lower()) for code in range(ord('A'), ord('Z') + 1)] +
+        [(code, chr(code)) for code in range(ord('0'), ord('9') + 1)] +
+        [(VK.Space, ' '), (VK.OemMinus, '-'), (VK.OemPeriod, '.'), (VK.Oem2, '/'), (VK.Oem5, '\\')]
+    )
+    search_keys = (
+        KeyItem('Back', (VK.Back, 0)),
+        KeyItem('Query', (VK.KeyF, 8)),  # LEFT_CTRL_PRESSED
     )
 
     log_level = {
@@ -122,55 +1282,121 @@ class DirHotListPlugin(pygin.Plugin):
 
     def add_log(func):
         """
-        Добавляет логирование при вызове функций
+        Добавляет логирование и замер времени при вызове функций, если включено отладочное логирование.
+        Иначе функция остается без обертки
 
         :return:
         """
-
-        def wrapper(self, *args, **kwargs):
-            logging.debug(f"Function: {func.__name__}")
-            exit_code = func(self, *args, **kwargs)
-            logging.debug(f"Exit code '{func.__name__}': {exit_code}")
-            return exit_code
-
-        return wrapper
+        return MethodTrace.Method(func)
 
     def __init__(self):
+        init_start = time.perf_counter()
         self.settings_file = os.path.expandvars(r'%FARLOCALPROFILE%\DirHotList\settings.yaml')
         self.menu_file = r'%FARLOCALPROFILE%\DirHotList\menu.yaml'
         self.log_file = r'%FARLOCALPROFILE%\DirHotList\DirHotList.log'
         self.log_level = logging.NOTSET
+        self.log_max_bytes = 1024 * 1024
+        self.log_backup_count = 3
+        self.log_handler: logging.Handler | None = None
+        self.log_listener: 'logging.handlers.QueueListener | None' = None
+        self.root = None
+        self.search_index = SearchIndex()
+        self.path_index = PathIndex()
+        self.reachability = ReachabilityChecker(lambda: self.Synchro(self._on_reachability))
+        self.current_directory = ''
+        self.current_items: dict[int, MenuItem] = {}
+        self.usage: UsageStats | None = None
+        self.most_used = GroupMenuItem('', [])
+        self.most_used_count = 10
+        self.menu_break_keys = [far.FarKey(*key.key) for key in DirHotListPlugin.menu_keys]
+        self.search_break_keys = [far.FarKey(*key.key) for key in DirHotListPlugin.search_keys] + \
+                                 [far.FarKey(code, 0) for code, _ in DirHotListPlugin.search_chars]
+        self.saver = SaveScheduler(self._save_job, self._write_menu, self.Synchro)
+        # (идентификатор сообщения, имя файла, подробности или их идентификатор):
+        # ошибка записи возникает в фоновом потоке, а строки сообщений получаются в основном
+        self.save_error: tuple[Lng, str, str | Lng] | None = None
+        self.file_versions: dict[str, tuple[int, int] | None] = {}
+        self.conflicts: set[str] = set()
+        super().__init__()
+        self.startup_times = {'import': _import_time, 'init': time.perf_counter() - init_start}
+
+    def _read_settings(self) -> None:
+        """
+        Читает файл настроек
+
+        :return:
+        """
         if os.path.exists(self.settings_file):
             with open(self.settings_file, 'r', encoding="utf-8") as yaml_file:
-                settings = yaml.load(yaml_file, Loader=yaml.FullLoader)
+                settings = Yaml.get().load(yaml_file)
                 if type(settings) is dict:
                     self.menu_file = settings.get('menu_file', self.menu_file)
                     self.log_file = settings.get('log_file', self.log_file)
                     self.log_level = DirHotListPlugin.log_level[settings.get('log_level', 'NOTSET')]
-        self._set_log()
-        logging.debug(f"Function: __init__")
-        super().__init__()
-        self._load()
-        logging.debug(f"Exit code __init__': None")
+
+    def _prepare(self) -> None:
+        """
+        Читает настройки и загружает меню при первом обращении к плагину
+
+        :return:
+        """
+        if self.root is None:
+            prepare_start = time.perf_counter()
+            self._read_settings()
+            self._set_log()
+            self._load()
+            self.startup_times['prepare'] = time.perf_counter() - prepare_start
+            logging.debug("Startup times, ms: " +
+                          ", ".join(f"{key}: {value * 1000:.1f}" for key, value in self.startup_times.items()))
 
     def _set_log(self):
+        """
+        Настраивает логирование. Записи передаются через очередь фоновому потоку,
+        который пишет их в файл с ротацией по размеру. При повторном вызове
+        ранее установленный обработчик заменяется
+
+        :return:
+        """
+        MethodTrace.configure(logging.NOTSET < self.log_level <= logging.DEBUG)
+        self._stop_log()
+        logger = logging.getLogger()
         if self.log_level == logging.NOTSET:
-            logger = logging.getLogger()
-            for handler in logger.handlers.copy():
-                try:
-                    logger.removeHandler(handler)
-                except ValueError:  # in case another thread has already removed it
-                    pass
-            logger.addHandler(logging.NullHandler())
+            self.log_handler = logging.NullHandler()
             logger.propagate = False
+            logger.setLevel(logging.WARNING)
         else:
-            logging.basicConfig(
-                filename=os.path.expandvars(self.log_file),
+            # logging.handlers загружает socket и pickle, без логирования он не нужен
+            from logging import handlers
+            file_handler = handlers.RotatingFileHandler(
+                os.path.expandvars(self.log_file),
+                maxBytes=self.log_max_bytes,
+                backupCount=self.log_backup_count,
                 encoding='utf-8',
-                level=self.log_level,
-                format='%(asctime)s|%(levelname)-10s|%(message)s',
-                datefmt='%Y-%m-%d %H:%M:%S'
-            )
+                delay=True)
+            file_handler.setFormatter(logging.Formatter(
+                fmt='%(asctime)s|%(levelname)-10s|%(message)s',
+                datefmt='%Y-%m-%d %H:%M:%S'))
+            log_queue = queue.SimpleQueue()
+            self.log_listener = handlers.QueueListener(log_queue, file_handler)
+            self.log_listener.start()
+            self.log_handler = handlers.QueueHandler(log_queue)
+            logger.setLevel(self.log_level)
+        logger.addHandler(self.log_handler)
+
+    def _stop_log(self):
+        """
+        Снимает установленный обработчик и дожидается записи накопленных в очереди сообщений
+
+        :return:
+        """
+        if self.log_handler is not None:
+            logging.getLogger().removeHandler(self.log_handler)
+            self.log_handler = None
+        if self.log_listener is not None:
+            self.log_listener.stop()
+            for handler in self.log_listener.handlers:
+                handler.close()
+            self.log_listener = None
 
     @add_log
     def _load(self) -> None:
@@ -179,71 +1405,396 @@ class DirHotListPlugin(pygin.Plugin):
 
         :return:
         """
-
-        def build_menu_items(items):
-            result = []
-            for item in items:
-                key, value = item.popitem()
-                if type(value) is list:
-                    result.append(GroupMenuItem(key, build_menu_items(value)))
-                else:
-                    result.append(ShortcutMenuItem(key, value if value else None))
-            return result
+        self._flush_save()
 
         menu_file = os.path.expandvars(self.menu_file)
+        if self.usage is None or self.usage.usage_file != menu_file + '.usage':
+            self.usage = UsageStats(menu_file + '.usage')
+            self.usage.load()
         self.root = GroupMenuItem('\\', [])
-        if os.path.exists(menu_file):
-            error_message = ""
-            error_fmt = "Ошибка чтения файла {}:\nСтрока {}, колонка {}:\n{}"
-            with open(menu_file, 'r', encoding="utf-8") as yaml_file:
-                try:
-                    self.root.items = build_menu_items(
-                        yaml.load(yaml_file, Loader=yaml.FullLoader))
-                except yaml.scanner.ScannerError as e:
-                    error_message = error_fmt.format(menu_file, e.problem_mark.line + 1, e.problem_mark.column + 1,
-                                                     e.problem)
-                except yaml.parser.ParserError as e:
-                    error_message = error_fmt.format(menu_file, e.problem_mark.line + 1, e.problem_mark.column + 1,
-                                                     e.problem)
-
-            if error_message:
-                self.Message(
+        self.file_versions = {}
+        self.conflicts = set()
+        self.root.items = self._read_menu_file(menu_file)
+        self._on_tree_loaded()
+
+    def _read_menu_file(self, menu_file: str) -> list[MenuItem]:
+        """
+        Читает файл меню из снимка или разбирает его и запоминает версию файла
+
+        :param menu_file: Имя файла меню
+        :return: Элементы группы
+        """
+        self.file_versions[menu_file] = None
+        if not os.path.exists(menu_file):
+            return []
+        snapshot = MenuSnapshot(menu_file)
+        items = snapshot.load()
+        self.file_versions[menu_file] = snapshot.stat.st_size, snapshot.stat.st_mtime_ns
+        if items is not None:
+            logging.debug(f"Menu is loaded from snapshot {snapshot.snapshot_file}")
+            return items
+        return self._parse_menu(snapshot)
+
+    def _include_file(self, group: IncludeGroupMenuItem) -> str:
+        """
+        Имя включаемого файла группы. Относительные пути отсчитываются от каталога файла меню
+
+        :param group: Группа из включаемого файла
+        :return: Полное имя файла
+        """
+        include = expandvars(group.include)
+        if not os.path.isabs(include):
+            include = os.path.join(os.path.dirname(os.path.expandvars(self.menu_file)), include)
+        return os.path.normpath(include)
+
+    def _load_include(self, group: IncludeGroupMenuItem) -> None:
+        """
+        Читает включаемый файл группы при первом открытии или после его изменения другой программой
+
+        :param group: Группа из включаемого файла
+        :return:
+        """
+        include_file = self._include_file(group)
+        if group.loaded and (include_file in self.conflicts or
+                             file_version(include_file) == self.file_versions.get(include_file)):
+            return
+        self._flush_save()
+        logging.debug(f"Include file: {include_file}")
+        for item in group.items:
+            self._on_removed(group, item)
+        group.items = self._read_menu_file(include_file)
+        group.loaded = True
+        for item in group.items:
+            self._on_added(group, item)
+
+    def _owner(self, group: GroupMenuItem) -> GroupMenuItem:
+        """
+        Группа, в файле которой хранятся элементы группы: корневая или группа из включаемого файла
+
+        :param group: Группа элементов
+        :return: Корневая группа или группа из включаемого файла
+        """
+        node = group
+        while node is not None and node is not self.root:
+            if type(node) is IncludeGroupMenuItem:
+                return node
+            node = self.path_index.parent(node)
+        return self.root
+
+    def _reload_changed(self) -> None:
+        """
+        Перечитывает файл меню, если его изменила другая программа.
+        Не перечитывает, пока в памяти есть изменения, не записанные из-за такого конфликта
+
+        :return:
+        """
+        menu_file = os.path.expandvars(self.menu_file)
+        if menu_file in self.conflicts:
+            return
+        self._flush_save()
+        if menu_file not in self.conflicts and file_version(menu_file) != self.file_versions.get(menu_file):
+            logging.info("Menu file is changed externally, reloading")
+            self._load()
+
+    def _parse_menu(self, snapshot: MenuSnapshot) -> list[MenuItem]:
+        """
+        Разбирает файл меню, прочитанный при проверке снимка, и сохраняет новый снимок
+
+        :param snapshot: Снимок с содержимым файла меню
+        :return: Элементы группы, пустой список при ошибке
+        """
+        menu_file = snapshot.menu_file
+        Yaml.get()
+        items = []
+        error_message = ""
+        error_fmt = "Ошибка чтения файла {}:\nСтрока {}, колонка {}:\n{}"
+        try:
+            items = build_menu_items(
+                Yaml.load(snapshot.data.decode('utf-8')) or [])
+            snapshot.save(items)
+        except Yaml.module.MarkedYAMLError as e:
+            if e.problem_mark is None:
+                error_message = error_fmt.format(menu_file, '?', '?', e.problem)
+            else:
+                error_message = error_fmt.format(menu_file, e.problem_mark.line + 1, e.problem_mark.column + 1,
+                                                 e.problem)
+
+        if error_message:
+            self.Message(
+                uuid.uuid4(),
+                far.MessageFlags.Warning + far.MessageFlags.LeftAlign + far.MessageFlags.ButtonOk,
+                "",
+                self.GetMsg(Lng.Title),
+                error_message.split("\n"),
+                [])
+            logging.error(error_message)
+        return items
+
+    def _on_tree_loaded(self) -> None:
+        """
+        Строит индексы после загрузки дерева
+
+        :return:
+        """
+        self.search_index.build(self.root)
+        self.path_index.build(self.root)
+        self._find_current()
+        self.reachability.check(self.path_index.directories.keys())
+        self._update_most_used()
+
+    def _on_added(self, group: GroupMenuItem, item: MenuItem) -> None:
+        """
+        Обновляет индексы после добавления элемента в группу
+
+        :return:
+        """
+        self.search_index.add(group, item)
+        self.path_index.add(group, item)
+        self._invalidate(group)
+        self.reachability.check(self._directories(item))
+        self._find_current()
+        self._update_most_used()
+
+    def _on_removed(self, group: GroupMenuItem, item: MenuItem) -> None:
+        """
+        Обновляет индексы после удаления элемента из группы
+
+        :return:
+        """
+        self.search_index.remove(item)
+        self.path_index.remove(item)
+        self._invalidate(group)
+        self._find_current()
+        self._update_most_used()
+
+    def _update_most_used(self) -> None:
+        """
+        Заполняет виртуальную группу часто используемых ссылок из упорядоченной статистики
+
+        :return:
+        """
+        items = []
+        for key in self.usage.top():
+            shortcuts = self.path_index.directories.get(key)
+            if shortcuts:
+                items.append(shortcuts[0])
+                if len(items) == self.most_used_count:
+                    break
+        self.most_used.name = self.GetMsg(Lng.MostUsed)
+        if [id(item) for item in items] != [id(item) for item in self.most_used.items]:
+            if bool(items) != bool(self.most_used.items):
+                self._invalidate(self.root)
+            self.most_used.items = items
+            self._invalidate(self.most_used)
+
+    def _invalidate_most_used(self, items) -> None:
+        """
+        Сбрасывает отрисованные элементы группы часто используемых ссылок, если в нее входит один из элементов
+
+        :param items: Измененные элементы
+        :return:
+        """
+        members = {id(item) for item in self.most_used.items}
+        if any(id(item) in members for item in items):
+            self._invalidate(self.most_used)
+
+    def _entries(self, group: GroupMenuItem) -> list[MenuItem]:
+        """
+        Элементы, отображаемые в меню группы: в корневой группе первой идет группа часто используемых ссылок
+
+        :param group: Группа элементов
+        :return: Список элементов
+        """
+        if group is self.root and self.most_used.items:
+            return [self.most_used] + group.items
+        return group.items
+
+    def _entry_id(self, group: GroupMenuItem, item_id: int | None) -> int | None:
+        """
+        Переводит идентификатор элемента группы в идентификатор элемента меню
+
+        :param group: Группа элементов
+        :param item_id: Идентификатор элемента группы
+        :return: Идентификатор элемента меню
+        """
+        if item_id is None:
+            return None
+        return item_id + len(self._entries(group)) - len(group.items)
+
+    def _directories(self, item: MenuItem) -> list[str]:
+        """
+        Нормализованные каталоги ссылок элемента и всех вложенных элементов
+
+        :param item: Элемент меню
+        :return: Список каталогов
+        """
+        match item:
+            case GroupMenuItem():
+                return [directory for child in item.items for directory in self._directories(child)]
+            case ShortcutMenuItem():
+                return [self.path_index.keys[id(item)]]
+        return []
+
+    def _on_reachability(self) -> None:
+        """
+        Вызывается в основном потоке после изменения доступности каталогов.
+        Сбрасывает отрисованные элементы групп со ссылками на эти каталоги
+
+        :return:
+        """
+        for directory in self.reachability.changes():
+            items = self.path_index.directories.get(directory, [])
+            for item in items:
+                self._invalidate(self.path_index.parent(item))
+            self._invalidate_most_used(items)
+
+    @staticmethod
+    def _invalidate(group: GroupMenuItem | None) -> None:
+        """
+        Сбрасывает отрисованные элементы меню группы
+
+        :param group: Группа элементов
+        :return:
+        """
+        if group is not None and group.view is not None:
+            group.view.invalidate()
+
+    def _on_changed(self, group: GroupMenuItem, item: MenuItem) -> None:
+        """
+        Обновляет индексы после изменения элемента группы
+
+        :return:
+        """
+        self.search_index.update(group, item)
+        self.path_index.update(group, item)
+        self._invalidate(group)
+        self._invalidate_most_used([item])
+        self.reachability.check(self._directories(item))
+        self._find_current()
+        self._update_most_used()
+
+    @add_log
+    def _save(self, group: GroupMenuItem) -> None:
+        """
+        Записывает файл меню, в котором хранится группа.
+        Если файл изменен другой программой, запрашивает подтверждение перезаписи
+
+        :param group: Группа элементов
+        :return:
+        """
+        self._flush_save()
+        job = self._save_job(self._owner(group))
+        if file_version(job.menu_file) != self.file_versions.get(job.menu_file):
+            if self.Message(
                     uuid.uuid4(),
-                    far.MessageFlags.Warning + far.MessageFlags.LeftAlign + far.MessageFlags.ButtonOk,
+                    far.MessageFlags.Warning,
                     "",
                     self.GetMsg(Lng.Title),
-                    error_message.split("\n"),
-                    [])
-                logging.error(error_message)
+                    [self.GetMsg(Lng.MenuChanged), job.menu_file],
+                    [self.GetMsg(Lng.Overwrite), self.GetMsg(Lng.Cancel)]) != 0:
+                return
+            job.force = True
+        self._flush_save(job)
 
-    @add_log
-    def _save(self) -> None:
+    def _save_later(self, group: GroupMenuItem) -> None:
         """
-        Записывает данные в файл меню
+        Отмечает файл меню, в котором хранится группа, как измененный и планирует его запись
 
+        :param group: Измененная группа
         :return:
         """
+        self.saver.schedule(self._owner(group))
 
-        def add_menu_items(menu_items: list[MenuItem]) -> list:
-            items = []
-            for menu_item in menu_items:
-                match menu_item:
-                    case GroupMenuItem():
-                        items.append({menu_item.name: add_menu_items(cast(GroupMenuItem, menu_item).items)})
-                    case ShortcutMenuItem():
-                        items.append({menu_item.name: cast(ShortcutMenuItem, menu_item).shortcut})
-            return items
+    def _flush_save(self, job: SaveJob | None = None) -> None:
+        """
+        Дописывает отложенные изменения и сообщает об ошибке записи
 
-        menu_file = os.path.expandvars(self.menu_file)
-        with open(menu_file, 'w', encoding='utf-8') as yaml_file:
-            yaml.SafeDumper.add_representer(
-                type(None),
-                lambda dumper, value: dumper.represent_scalar(u'tag:yaml.org,2002:null', '')
-            )
-            yaml.safe_dump(add_menu_items(self.root.items), yaml_file, encoding='utf-8', allow_unicode=True)
+        :param job: Более новое содержимое, заменяющее отложенное
+        :return:
+        """
+        self.saver.flush(job)
+        if self.save_error:
+            (message, menu_file, details), self.save_error = self.save_error, None
+            self.Message(
+                uuid.uuid4(),
+                far.MessageFlags.Warning + far.MessageFlags.LeftAlign + far.MessageFlags.ButtonOk,
+                "",
+                self.GetMsg(Lng.Title),
+                [self.GetMsg(message).format(menu_file),
+                 self.GetMsg(details) if type(details) is Lng else details],
+                [])
+
+    def _save_job(self, owner: GroupMenuItem) -> SaveJob:
+        """
+        Готовит содержимое файла меню к записи. Вызывается в основном потоке,
+        один раз на серию изменений, чтобы запись не обращалась к изменяемому дереву
 
-    @staticmethod
-    def _get_menu_items(group: GroupMenuItem, item_id: int) -> list[MenuItem]:
+        :param owner: Корневая группа или группа из включаемого файла
+        :return:
+        """
+        if owner is self.root:
+            menu_file = os.path.expandvars(self.menu_file)
+        else:
+            menu_file = self._include_file(cast(IncludeGroupMenuItem, owner))
+        return SaveJob(menu_file, menu_data(owner.items), MenuSnapshot(menu_file).encode(owner.items))
+
+    def _write_menu(self, job: SaveJob) -> None:
+        """
+        Записывает файл меню через временный файл, заменяя исходный атомарно
+
+        :param job: Подготовленное содержимое
+        :return:
+        """
+        if not job.force and file_version(job.menu_file) != self.file_versions.get(job.menu_file):
+            self.conflicts.add(job.menu_file)
+            self.save_error = (Lng.SaveConflict, job.menu_file, Lng.SaveConflictHint)
+            logging.error(f"Menu file {job.menu_file} is changed externally, changes are not saved")
+            return
+        temp_file = job.menu_file + '.tmp'
+        try:
+            with open(temp_file, 'w', encoding='utf-8') as yaml_file:
+                Yaml.get().dump(job.data, yaml_file)
+            os.replace(temp_file, job.menu_file)
+        except OSError as e:
+            self.save_error = (Lng.SaveFailed, job.menu_file, str(e))
+            logging.error(f"Menu file {job.menu_file} is not saved: {e}")
+            return
+        self.file_versions[job.menu_file] = file_version(job.menu_file)
+        self.conflicts.discard(job.menu_file)
+        MenuSnapshot(job.menu_file).store(job.snapshot)
+
+    def _find_current(self) -> None:
+        """
+        Находит ссылки на текущий каталог активной панели и группы, в которых они находятся
+
+        :return:
+        """
+        previous, self.current_items = self.current_items, {}
+        if self.current_directory:
+            for item in self.path_index.find(self.current_directory):
+                node = item
+                while node is not None and id(node) not in self.current_items:
+                    self.current_items[id(node)] = node
+                    node = self.path_index.parent(node)
+        # отметка текущего каталога входит в отрисованные элементы родительских групп
+        changed = [previous.get(key) or self.current_items[key] for key in previous.keys() ^ self.current_items.keys()]
+        for item in changed:
+            self._invalidate(self.path_index.parent(item))
+        self._invalidate_most_used(changed)
+
+    def _current_item_id(self, group: GroupMenuItem) -> int | None:
+        """
+        Идентификатор элемента группы, ведущего к текущему каталогу активной панели
+
+        :param group: Группа элементов
+        :return: Идентификатор элемента или None
+        """
+        for item_id, item in enumerate(self._entries(group)):
+            if id(item) in self.current_items:
+                return item_id
+        return None
+
+    def _get_menu_items(self, group: GroupMenuItem, item_id: int) -> list[MenuItem]:
         """
         Получает список элементов
 
@@ -254,14 +1805,26 @@ class DirHotListPlugin(pygin.Plugin):
 
         def get_flags(item):
             flags = far.MenuItemFlags.Default
-            if type(item) is GroupMenuItem:
+            if isinstance(item, GroupMenuItem):
                 flags += far.MenuItemFlags.Checked + 0x25BA
-            if item == selected_item:
-                flags += far.MenuItemFlags.Selected
+            else:
+                if id(item) in self.current_items:
+                    flags += far.MenuItemFlags.Checked
+                if self.reachability.reachable(self.path_index.keys[id(item)]) is False:
+                    flags += far.MenuItemFlags.Grayed
             return flags
 
-        selected_item = group.items[item_id] if item_id is not None else None
-        return [far.MenuItem(os.path.expandvars(item.name), get_flags(item)) for item in group.items]
+        if group.view is None:
+            group.view = GroupView()
+        view = group.view
+        if not view.valid():
+            entries = self._entries(group)
+            templates = [EnvTemplate.get(item.name) for item in entries]
+            view.items = [far.MenuItem(template.render(), get_flags(item))
+                          for template, item in zip(templates, entries)]
+            view.templates = [(template, template.result) for template in templates if template.names]
+            view.selected = None
+        return view.select(item_id)
 
     @add_log
     def _delete(self, group: GroupMenuItem, item_id: int) -> int:
@@ -273,7 +1836,8 @@ class DirHotListPlugin(pygin.Plugin):
         :return: Новый идентификатор выделенного элемента
         """
         if item_id is not None:
-            msg = {ShortcutMenuItem: Lng.DeleteShortcut, GroupMenuItem: Lng.DeleteGroup, MenuItem: None}
+            msg = {ShortcutMenuItem: Lng.DeleteShortcut, GroupMenuItem: Lng.DeleteGroup,
+                   IncludeGroupMenuItem: Lng.DeleteGroup, MenuItem: None}
             if self.Message(
                     uuid.uuid4(),
                     far.MessageFlags.Warning + far.MessageFlags.ButtonOkCancel,
@@ -284,10 +1848,10 @@ class DirHotListPlugin(pygin.Plugin):
                         group.items[item_id].name
                     ],
                     []) == 0:
-                group.items.pop(item_id)
+                self._on_removed(group, group.items.pop(item_id))
                 if item_id == len(group.items):
                     item_id -= 1
-                self._save()
+                self._save_later(group)
         return item_id
 
     @add_log
@@ -304,12 +1868,14 @@ class DirHotListPlugin(pygin.Plugin):
             if move_up:
                 if item_id > 0:
                     group.items.insert(item_id - 1, group.items.pop(item_id))
-                    self._save()
+                    self._invalidate(group)
+                    self._save_later(group)
                     return item_id - 1
             else:
                 if item_id < len(group.items) - 1:
                     group.items.insert(item_id + 1, group.items.pop(item_id))
-                    self._save()
+                    self._invalidate(group)
+                    self._save_later(group)
                     return item_id + 1
         return item_id
 
@@ -370,7 +1936,8 @@ class DirHotListPlugin(pygin.Plugin):
                     if item_id is None:
                         item_id = 0
                     group.items.insert(item_id, ShortcutMenuItem(**response))
-                    self._save()
+                    self._on_added(group, group.items[item_id])
+                    self._save_later(group)
             else:
                 response = self.InputBox(
                     uuid.uuid4(),
@@ -385,7 +1952,8 @@ class DirHotListPlugin(pygin.Plugin):
                     if item_id is None:
                         item_id = 0
                     group.items.insert(item_id, GroupMenuItem(name=response, items=[]))
-                    self._save()
+                    self._on_added(group, group.items[item_id])
+                    self._save_later(group)
         return item_id
 
     @add_log
@@ -411,13 +1979,87 @@ class DirHotListPlugin(pygin.Plugin):
                         far.InputBoxFlags.Buttons + far.InputBoxFlags.NoAmpersand)
                     if response is not None:
                         selected_item.name = response
-                        self._save()
+                        self._on_changed(group, selected_item)
+                        self._save_later(group)
                 case ShortcutMenuItem():
                     response = self._edit_shortcut_dialog(selected_item.name, selected_item.shortcut)
                     if response is not None:
                         selected_item.name = response['name']
                         selected_item.shortcut = response['shortcut']
-                        self._save()
+                        self._on_changed(group, selected_item)
+                        self._save_later(group)
+
+    def _dedup(self, item: MenuItem, seen: set[str]) -> MenuItem | None:
+        """
+        Убирает из импортируемого элемента ссылки на каталоги, которые уже есть в меню
+
+        :param item: Импортируемый элемент
+        :param seen: Каталоги, уже добавленные при импорте
+        :return: Элемент или None, если в нем не осталось ссылок
+        """
+        match item:
+            case GroupMenuItem():
+                item.items = [child for child in item.items if self._dedup(child, seen) is not None]
+                return item if item.items else None
+            case ShortcutMenuItem():
+                key = PathIndex.normalize(item.name if item.shortcut is None else item.shortcut)
+                if key in seen or key in self.path_index.directories:
+                    return None
+                seen.add(key)
+                return item
+        return None
+
+    @add_log
+    def _import(self, group: GroupMenuItem) -> None:
+        """
+        Импорт ссылок из внешнего списка в конец группы. Ссылки на каталоги, которые уже есть в меню,
+        пропускаются, файл меню записывается один раз после импорта
+
+        :param group: Группа элементов
+        :return:
+        """
+        file_name = self.InputBox(
+            uuid.uuid4(),
+            self.GetMsg(Lng.Import),
+            self.GetMsg(Lng.ImportFile),
+            DirHotListPlugin.cHImport,
+            "",
+            1024,
+            "Import",
+            far.InputBoxFlags.Buttons + far.InputBoxFlags.NoAmpersand + far.InputBoxFlags.EditPath)
+        if not file_name:
+            return
+        file_name = expandvars(file_name.strip('"'))
+        imported = skipped = 0
+        seen = set()
+        try:
+            for item in import_items(file_name):
+                total = count_shortcuts(item)
+                added = 0
+                if self._dedup(item, seen) is not None:
+                    group.items.append(item)
+                    self._on_added(group, item)
+                    added = count_shortcuts(item)
+                imported += added
+                skipped += total - added
+        except (OSError, SyntaxError) as e:  # ElementTree.ParseError - подкласс SyntaxError
+            self.Message(
+                uuid.uuid4(),
+                far.MessageFlags.Warning + far.MessageFlags.LeftAlign + far.MessageFlags.ButtonOk,
+                "",
+                self.GetMsg(Lng.Title),
+                [f"{file_name}:", str(e)],
+                [])
+            logging.error(f"Import from {file_name}: {e}")
+        if imported:
+            self._save_later(group)
+        self.Message(
+            uuid.uuid4(),
+            far.MessageFlags.ButtonOk,
+            "",
+            self.GetMsg(Lng.Import),
+            [self.GetMsg(Lng.ImportResult).format(imported, skipped)],
+            [])
 
     @add_log
     def _edit_menu(self) -> None:
@@ -426,6 +2068,7 @@ class DirHotListPlugin(pygin.Plugin):
 
         :return:
         """
+        self._flush_save()
         self.Editor(os.path.expandvars(self.menu_file), "", 0, 0, -1, -1, far.EditorFlags.CreateNew, -1, -1, 65001)
         self._load()
 
@@ -439,11 +2082,13 @@ class DirHotListPlugin(pygin.Plugin):
         :return: Код возврата. Если None, то выход из всех уровней вложенности
         """
         logging.debug(f"Group: {group.name}")
-        item_id = None
+        item_id = self._current_item_id(group)
         while True:
             break_code = [0]
+            menu_items = self._get_menu_items(group, item_id)
+            entries = self._entries(group)
             item_id = self.Menu(
-                uuid.uuid4(),  # DirHotListPlugin.MenuGuid,
+                group.view.guid,
                 -1,
                 -1,
                 0,
@@ -451,9 +2096,9 @@ class DirHotListPlugin(pygin.Plugin):
                 f'{self.GetMsg(Lng.Title)}: "{group.name}"',
                 self.GetMsg(Lng.Footer),
                 "DirectoryHotlist",
-                [far.FarKey(*key.key) for key in DirHotListPlugin.menu_keys],
+                self.menu_break_keys,
                 break_code,
-                self._get_menu_items(group, item_id))
+                menu_items)
 
             break_action = ""
             if len(break_code) > 0:
@@ -462,42 +2107,122 @@ class DirHotListPlugin(pygin.Plugin):
                     break_action = DirHotListPlugin.menu_keys[break_code[0]].name if break_code[0] >= 0 else 'Exit'
                     logging.debug(f"break_action: {break_action}")
 
+            # виртуальная группа часто используемых ссылок не изменяется,
+            # остальные действия выполняются над элементами самой группы
+            offset = len(entries) - len(group.items)
+            if group is self.most_used or (item_id is not None and item_id < offset):
+                if break_action in ('Edit', 'Insert', 'Delete', 'MoveUp', 'MoveDown', 'Import'):
+                    continue
+            group_id = item_id - offset if item_id is not None else None
+
             match break_action:
                 case 'Exit':  # enter, f10, esc
                     if item_id is None:
                         return None if is_root else -1
                     else:
-                        match group.items[item_id]:
+                        match entries[item_id]:
                             case ShortcutMenuItem():
-                                selected_item = cast(ShortcutMenuItem, group.items[item_id])
-                                panel_directory = far.PanelDirectory()
-                                panel_directory.Name = os.path.expandvars(
-                                    selected_item.name if selected_item.shortcut is None else selected_item.shortcut)
-                                self.ActivePanel.PanelControl(far.FileControlCommands.SetPanelDirectory, 0,
-                                                              panel_directory)
+                                self._jump(cast(ShortcutMenuItem, entries[item_id]))
                                 return None
                             case GroupMenuItem():
-                                selected_item = cast(GroupMenuItem, group.items[item_id])
+                                selected_item = cast(GroupMenuItem, entries[item_id])
+                                if type(selected_item) is IncludeGroupMenuItem:
+                                    self._load_include(selected_item)
                                 if self._menu(selected_item) is None:
                                     return None
                 case 'Edit':
-                    self._edit(group, item_id)
+                    self._edit(group, group_id)
                 case 'Insert':
-                    item_id = self._insert(group, item_id)
+                    item_id = self._entry_id(group, self._insert(group, group_id))
                 case 'Delete':
-                    item_id = self._delete(group, item_id)
+                    item_id = self._entry_id(group, self._delete(group, group_id))
                 case ('MoveUp' | 'MoveDown'):
-                    item_id = self._move(group, item_id, break_action == 'MoveUp')
+                    item_id = self._entry_id(group, self._move(group, group_id, break_action == 'MoveUp'))
                 case 'Update':
                     if is_root:
                         self._load()
                         return -1
                 case 'Save':
-                    self._save()
+                    self._save(group)
                 case 'MenuEdit':
                     if is_root:
                         self._edit_menu()
                         return -1
+                case 'Search':
+                    if self._search() is None:
+                        return None
+                case 'Import':
+                    self._import(group)
+
+    @add_log
+    def _jump(self, item: ShortcutMenuItem) -> None:
+        """
+        Переход по ссылке на активной панели
+
+        :param item: Ссылка
+        :return:
+        """
+        panel_directory = far.PanelDirectory()
+        panel_directory.Name = expandvars(item.name if item.shortcut is None else item.shortcut)
+        self.ActivePanel.PanelControl(far.FileControlCommands.SetPanelDirectory, 0, panel_directory)
+        self.usage.record(self.path_index.keys[id(item)])
+        self.usage.save()
+        self._update_most_used()
+
+    @add_log
+    def _search(self) -> int | None:
+        """
+        Поиск по всем ссылкам дерева. Строка поиска набирается прямо в меню,
+        Ctrl+F открывает ее редактирование (например, для ввода кириллицы)
+
+        :return: Код возврата. Если None, то был переход по ссылке
+        """
+        query = ''
+        item_id = None
+        while True:
+            entries = self.search_index.search(query)
+            if item_id is not None and item_id >= len(entries):
+                item_id = len(entries) - 1 if entries else None
+            break_code = [0]
+            item_id = self.Menu(
+                uuid.uuid4(),
+                -1,
+                -1,
+                0,
+                far.MenuFlags.WrapMode,
+                f'{self.GetMsg(Lng.Search)}: "{query}"',
+                self.GetMsg(Lng.SearchFooter),
+                "Search",
+                self.search_break_keys,
+                break_code,
+                [far.MenuItem(entry.display, far.MenuItemFlags.Selected if index == item_id else 0)
+                 for index, entry in enumerate(entries)])
+
+            code = break_code[0] if len(break_code) > 0 else -1
+            if code < 0:  # enter, f10, esc
+                if item_id is None or item_id >= len(entries):
+                    return -1
+                self._jump(entries[item_id].item)
+                return None
+            if code < len(DirHotListPlugin.search_keys):
+                match DirHotListPlugin.search_keys[code].name:
+                    case 'Back':
+                        query = query[:-1]
+                    case 'Query':
+                        response = self.InputBox(
+                            uuid.uuid4(),
+                            self.GetMsg(Lng.Search),
+                            self.GetMsg(Lng.SearchQuery),
+                            DirHotListPlugin.cHistoryPrefix + 'Search',
+                            query,
+                            1024,
+                            "Search",
+                            far.InputBoxFlags.Buttons + far.InputBoxFlags.NoAmpersand + far.InputBoxFlags.EnableEmpty)
+                        if response is not None:
+                            query = response
+            else:
+                query += DirHotListPlugin.search_chars[code - len(DirHotListPlugin.search_keys)][1]
+                item_id = 0
 
     def GetPluginInfoW(self) -> pygin.PluginInfo:
         """
@@ -521,11 +2246,47 @@ class DirHotListPlugin(pygin.Plugin):
         :param info: Класс PluginInfo с заполненной информацией о плагине
         :return:
         """
+        self._prepare()
+        self._reload_changed()
+        self.reachability.check(self.path_index.directories.keys())
+        directory = self.ActivePanel.PanelControl(far.FileControlCommands.GetPanelDirectory)
+        self.current_directory = directory.Name if directory is not None else ''
+        self._find_current()
         while True:
             if self._menu(self.root, True) is None:
                 break
+        self._flush_save()
         return None
 
+    @add_log
+    def ExitFARW(self, info: far.ExitInfo) -> None:
+        """
+        Функция ExitFARW вызывается Far Manager'ом перед выгрузкой плагина
+
+        :param info: Класс ExitInfo
+        :return:
+        """
+        self.saver.flush()
+        self.reachability.close()
+        self._stop_log()
+
+    def _show_statistics(self) -> None:
+        """
+        Показывает статистику времени выполнения методов и записывает ее в лог
+
+        :return:
+        """
+        lines = [self.GetMsg(Lng.StatisticsHeader)] + MethodTrace.report()
+        for line in lines:
+            logging.info(line)
+        self.Message(
+            uuid.uuid4(),
+            far.MessageFlags.LeftAlign + far.MessageFlags.ButtonOk,
+            "",
+            self.GetMsg(Lng.Statistics).replace('&', ''),
+            lines,
+            [])
+
     @add_log
     def ConfigureW(self, info: pygin.PluginInfo) -> int:
         """
@@ -534,6 +2295,7 @@ class DirHotListPlugin(pygin.Plugin):
         :param info: Класс PluginInfo с заполненной информацией о плагине
         :return:
         """
+        self._prepare()
         size_x = 70
         size_y = 11
         left_side = 5
@@ -547,6 +2309,8 @@ class DirHotListPlugin(pygin.Plugin):
         edit_menu_file = far.DialogEdit(left_side, 6, size_x - left_side - 1, self.menu_file)
         btn_ok = far.DialogButton(0, size_y - 3, self.GetMsg(Lng.Ok),
                                   far.DialogItemFlags.DEFAULTBUTTON + far.DialogItemFlags.CENTERGROUP)
+        btn_statistics = far.DialogButton(0, size_y - 3, self.GetMsg(Lng.Statistics),
+                                          far.DialogItemFlags.CENTERGROUP)
         items = [
             far.DialogDoubleBox(left_side - 2, 1, size_x - left_side + 1, size_y - 2, self.GetMsg(Lng.Title)),
             far.DialogText(left_side, 2, -1, self.GetMsg(Lng.LogLevel)),
@@ -559,8 +2323,12 @@ class DirHotListPlugin(pygin.Plugin):
             btn_ok,
             far.DialogButton(0, size_y - 3, self.GetMsg(Lng.Cancel), far.DialogItemFlags.CENTERGROUP),
         ]
+        if MethodTrace.enabled:
+            items.insert(-1, btn_statistics)
         result = self.DialogRun(uuid.uuid4(), -1, -1, size_x, size_y, "", items, 0)
-        if result == items.index(btn_ok):
+        if MethodTrace.enabled and result == items.index(btn_statistics):
+            self._show_statistics()
+        elif result == items.index(btn_ok):
             log_level = combo_box_level.Data
             if log_level not in DirHotListPlugin.log_level:
                 log_level = 'NOTSET'
@@ -575,12 +2343,10 @@ class DirHotListPlugin(pygin.Plugin):
                     'log_file': self.log_file,
                     'log_level': log_level
                 }
-                yaml.SafeDumper.add_representer(
-                    type(None),
-                    lambda dumper, value: dumper.represent_scalar(u'tag:yaml.org,2002:null', '')
-                )
-                yaml.safe_dump(settings, yaml_file, encoding='utf-8', allow_unicode=True)
+                Yaml.get().dump(settings, yaml_file)
         return False
 
 
 FarPluginClass = DirHotListPlugin
+
+_import_time = time.perf_counter() - _import_start
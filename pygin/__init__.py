@@ -36,3 +36,4 @@ from pygin.helpers import *
 
 import pygin._loader
 import pygin._logging
+import pygin.apistats
@@ -32,41 +32,75 @@ THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 """
 
 import sys
+import os
 import os.path
+import time
 import importlib
-from importlib.util import spec_from_file_location, module_from_spec
+from importlib.util import spec_from_file_location, module_from_spec, source_hash
 
+# Python isn't smart enough to find a spec for a module that wasn't loaded from sys.path
+class FarPluginSpecImporter:
+	specs = {}
+
+	@classmethod
+	def find_spec(cls, fullname, path=None, target=None):
+		return cls.specs.get(fullname)
+
+sys.meta_path.append(FarPluginSpecImporter)
+
+# name: (path, st_mtime_ns, st_size, source hash) of the last executed source
+_signatures = {}
+
+# name: (seconds, executed) of the last load, printed if PYGIN_LOAD_STATS is set
+load_times = {}
+
+def _signature(name: str, path: str):
+	stat = os.stat(path)
+	previous = _signatures.get(name)
+	if previous is not None and previous[:3] == (path, stat.st_mtime_ns, stat.st_size):
+		return previous
+	with open(path, "rb") as source:
+		return path, stat.st_mtime_ns, stat.st_size, source_hash(source.read())
 
 def _reload_plugin(name: str, spec):
-	# Python isn't smart enough to find a spec for a module that wasn't loaded from sys.path
-	class FarPluginSpecImporter:
-		@classmethod
-		def find_spec(cls, fullname, path=None, target=None):
-			return spec if fullname == name else None
+	FarPluginSpecImporter.specs[name] = spec
+	return importlib.reload(sys.modules[name])
 
-	sys.meta_path.append(FarPluginSpecImporter)
-	try:
-		return importlib.reload(sys.modules[name])
-	finally:
-		sys.meta_path.remove(FarPluginSpecImporter)
+def _load_plugin_impl(name: str, path: str, force: bool = False):
+	"""
+	Executes the module unless it is already loaded from the same unchanged source.
+	Bytecode is cached in __pycache__ by the source loader as usual.
+	Returns (module, executed)
+	"""
+	signature = _signature(name, path)
+	previous = _signatures.get(name)
+	if not force and name in sys.modules and previous is not None and (previous[0], previous[3]) == (signature[0], signature[3]):
+		_signatures[name] = signature
+		return sys.modules[name], False
 
-def _load_plugin_impl(name: str, path: str):
 	spec = spec_from_file_location(name, path)
 
 	if name in sys.modules.keys():
-		return _reload_plugin(name, spec)
-
-	module = module_from_spec(spec)
-	sys.modules[name] = module
-	spec.loader.exec_module(module)
-	return module
+		module = _reload_plugin(name, spec)
+	else:
+		module = module_from_spec(spec)
+		sys.modules[name] = module
+		spec.loader.exec_module(module)
+	_signatures[name] = signature
+	return module, True
 
 def _load_plugin(name: str, path: str):
+	start = time.perf_counter()
 	package_path = os.path.dirname(path)
 	package_init = os.path.join(package_path, "__init__.py")
+	package_executed = False
 	if os.path.exists(package_init):
 		package_name = os.path.basename(package_path)
-		_load_plugin_impl(package_name, package_init)
+		_, package_executed = _load_plugin_impl(package_name, package_init)
 		name = package_name + "." + name
 
-	return _load_plugin_impl(name, path)
+	module, executed = _load_plugin_impl(name, path, package_executed)
+	load_times[name] = (time.perf_counter() - start, executed)
+	if os.environ.get("PYGIN_LOAD_STATS"):
+		print("pygin: {0} {1} in {2:.1f} ms".format(name, "loaded" if executed else "unchanged", load_times[name][0] * 1000))
+	return module
@@ -34,21 +34,101 @@ THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 import sys
 import os
 import tempfile
+import threading
+import atexit
 
 class Logger:
-	def __init__(self):
+	"""
+	Tees stdout/stderr into %TEMP%\\pygin.log.
+	Writes are buffered and appended to the file by a background thread on newline,
+	when the buffer grows over max_buffer or every flush_interval seconds.
+	The file is rotated to pygin.log.1 ... pygin.log.<backup_count> when it exceeds max_bytes.
+	"""
+
+	def __init__(self, max_bytes=1024 * 1024, backup_count=1, max_buffer=64 * 1024, flush_interval=1.0):
 		self.terminal = sys.stdout
 		self.logfile = os.path.join(tempfile.gettempdir(), "pygin.log")
+		self.max_bytes = max_bytes
+		self.backup_count = backup_count
+		self.max_buffer = max_buffer
+		self.flush_interval = flush_interval
+		self.buffer = []
+		self.buffered = 0
+		self.lock = threading.Lock()
+		self.file_lock = threading.Lock()
+		self.wakeup = threading.Event()
+		self.closed = False
+		self.writer = threading.Thread(target=self._writer, name="pygin.log", daemon=True)
+		self.writer.start()
 
 	def write(self, message):
-		with open(self.logfile, "a") as log:
-			log.write(message)
-		self.terminal.write(message)
-		self.flush()
+		with self.lock:
+			self.buffer.append(message)
+			self.buffered += len(message)
+			urgent = self.buffered >= self.max_buffer
+		if self.closed:
+			self._drain()
+		elif urgent or "\n" in message:
+			self.wakeup.set()
+		if self.terminal is not None:
+			self.terminal.write(message)
+			if "\n" in message:
+				self.terminal.flush()
+		return len(message)
 
 	def flush(self):
-		self.terminal.flush()
+		if self.terminal is not None:
+			self.terminal.flush()
+		self._drain()
+
+	def close(self):
+		self.closed = True
+		self.wakeup.set()
+		self.writer.join(self.flush_interval)
+		self._drain()
+
+	def _writer(self):
+		while not self.closed:
+			self.wakeup.wait(self.flush_interval)
+			self.wakeup.clear()
+			self._drain()
+
+	def _drain(self):
+		with self.file_lock:
+			with self.lock:
+				if not self.buffer:
+					return
+				data = "".join(self.buffer)
+				self.buffer = []
+				self.buffered = 0
+			try:
+				with open(self.logfile, "a") as log:
+					log.write(data)
+					size = log.tell()
+				if size > self.max_bytes:
+					self._rotate()
+			except OSError:
+				pass
+
+	def _rotate(self):
+		if self.backup_count <= 0:
+			os.remove(self.logfile)
+			return
+		for i in range(self.backup_count - 1, 0, -1):
+			source = "{0}.{1}".format(self.logfile, i)
+			if os.path.exists(source):
+				os.replace(source, "{0}.{1}".format(self.logfile, i + 1))
+		os.replace(self.logfile, self.logfile + ".1")
 
 Log = Logger()
 sys.stdout = Log
 sys.stderr = Log
+atexit.register(Log.close)
+
+def _excepthook(*args, hook=sys.excepthook):
+	try:
+		hook(*args)
+	finally:
+		Log.flush()
+
+sys.excepthook = _excepthook
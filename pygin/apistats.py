@@ -0,0 +1,150 @@
+﻿"""
+Far API call statistics
+"""
+"""
+apistats.py
+"""
+"""
+Copyright 2017 Alex Alabuzhev
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions
+are met:
+1. Redistributions of source code must retain the above copyright
+   notice, this list of conditions and the following disclaimer.
+2. Redistributions in binary form must reproduce the above copyright
+   notice, this list of conditions and the following disclaimer in the
+   documentation and/or other materials provided with the distribution.
+3. The name of the authors may not be used to endorse or promote products
+   derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE AUTHOR ``AS IS'' AND ANY EXPRESS OR
+IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES
+OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR ANY DIRECT, INDIRECT,
+INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT
+NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF
+THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+"""
+Opt-in per-call statistics of the far API wrappers: call counts, cumulative and
+maximal time and a latency histogram with power-of-two buckets.
+PanelControl and AdvControl calls are accounted per command.
+
+Statistics are collected after enable() or when the PYGIN_API_STATS environment
+variable is set; in the latter case they are written on exit to the file it names
+(or to %TEMP%\\pygin_api_stats.json if it is set to 1).
+While disabled, the wrappers call the natives directly, so there is no overhead.
+"""
+
+import atexit
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import *
+
+from pygin import far
+
+class ApiStats:
+    __slots__ = ("Count", "Total", "Max", "Histogram")
+
+    def __init__(self):
+        self.Count = 0
+        self.Total = 0
+        self.Max = 0
+        # bucket n counts calls that took [2**(n-1), 2**n) nanoseconds
+        self.Histogram = [0] * 64
+
+    def add(self, Elapsed: int):
+        self.Count += 1
+        self.Total += Elapsed
+        if Elapsed > self.Max:
+            self.Max = Elapsed
+        self.Histogram[min(Elapsed.bit_length(), 63)] += 1
+
+    def as_dict(self) -> dict:
+        return {
+            "count": self.Count,
+            "total_ms": self.Total / 1e6,
+            "mean_us": self.Total / self.Count / 1e3 if self.Count else 0.0,
+            "max_us": self.Max / 1e3,
+            # upper bucket bound in microseconds: calls
+            "histogram_us": {"<{0:g}".format(2 ** Bucket / 1e3): Count for Bucket, Count in enumerate(self.Histogram) if Count},
+        }
+
+_CommandArguments = {
+    "PanelControl": (1, far.FileControlCommands),
+    "AdvControl": (1, far.AdvancedControlCommands),
+}
+
+_Stats: Dict[Tuple[str, Any], ApiStats] = {}
+_Lock = threading.Lock()
+
+def _wrap(Name: str, Native: Callable) -> Callable:
+    Clock = time.perf_counter_ns
+    Lock = _Lock
+    CommandArgument = _CommandArguments.get(Name, (None,))[0]
+
+    def Timed(*Args):
+        Start = Clock()
+        try:
+            return Native(*Args)
+        finally:
+            Elapsed = Clock() - Start
+            Key = (Name, None if CommandArgument is None else int(Args[CommandArgument]))
+            with Lock:
+                Stats = _Stats.get(Key)
+                if Stats is None:
+                    Stats = _Stats[Key] = ApiStats()
+                Stats.add(Elapsed)
+
+    return Timed
+
+def enabled() -> bool:
+    return far._NativeWrapper is _wrap
+
+def enable():
+    far._NativeWrapper = _wrap
+    far._unbind_api()
+
+def disable():
+    far._NativeWrapper = None
+    far._unbind_api()
+
+def reset():
+    with _Lock:
+        _Stats.clear()
+
+def _key_name(Name: str, Command: Any) -> str:
+    if Command is None:
+        return Name
+    return "{0}.{1}".format(Name, _CommandArguments[Name][1](Command).name)
+
+def snapshot() -> Dict[str, dict]:
+    """Returns {"Name" or "Name.Command": statistics} ordered by total time"""
+    with _Lock:
+        Items = [(_key_name(*Key), Stats.as_dict()) for Key, Stats in _Stats.items()]
+    return dict(sorted(Items, key=lambda Item: Item[1]["total_ms"], reverse=True))
+
+def report() -> str:
+    Lines = ["{0:<40} {1:>10} {2:>12} {3:>10} {4:>10}".format("Call", "Count", "Total, ms", "Mean, us", "Max, us")]
+    for Name, Stats in snapshot().items():
+        Lines.append("{0:<40} {1:>10} {2:>12.3f} {3:>10.1f} {4:>10.1f}".format(
+            Name, Stats["count"], Stats["total_ms"], Stats["mean_us"], Stats["max_us"]))
+    return "\n".join(Lines)
+
+def dump(FileName: str):
+    with open(FileName, "w") as File:
+        json.dump(snapshot(), File, indent=2)
+
+_Setting = os.environ.get("PYGIN_API_STATS")
+if _Setting:
+    enable()
+    atexit.register(dump, os.path.join(tempfile.gettempdir(), "pygin_api_stats.json") if _Setting == "1" else _Setting)
@@ -0,0 +1,140 @@
+﻿"""
+API dispatch microbenchmarks
+"""
+"""
+benchmark.py
+"""
+"""
+Copyright 2017 Alex Alabuzhev
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions
+are met:
+1. Redistributions of source code must retain the above copyright
+   notice, this list of conditions and the following disclaimer.
+2. Redistributions in binary form must reproduce the above copyright
+   notice, this list of conditions and the following disclaimer in the
+   documentation and/or other materials provided with the distribution.
+3. The name of the authors may not be used to endorse or promote products
+   derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE AUTHOR ``AS IS'' AND ANY EXPRESS OR
+IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES
+OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR ANY DIRECT, INDIRECT,
+INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT
+NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF
+THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+"""
+Usage: python -m pygin.benchmark [--number N] [--repeat R] [--json FILE] [--baseline FILE] [--tolerance T]
+
+Runs every far wrapper against the headless StubHost and reports the
+per-call cost in nanoseconds. With --baseline the run fails (exit code 1)
+when any case is slower than the stored one by more than the tolerance factor.
+"""
+
+import argparse
+import json
+import sys
+import timeit
+import uuid
+from array import array
+from typing import *
+
+from pygin import far
+from pygin.helpers import Plugin
+from pygin.stubhost import StubHost
+
+class BenchmarkPlugin(Plugin):
+    Guid = uuid.UUID("{6b1c5ad8-0b35-4d1e-9a0e-2c4a1d1b7f00}")
+
+def _cases(Host: StubHost) -> Dict[str, Callable]:
+    Guid = BenchmarkPlugin.Guid
+    Id = uuid.UUID("{f5d3b5c4-6a8e-4d1b-8a55-0e8f3c3b1a01}")
+    Natives = Host.Natives()
+    Instance = BenchmarkPlugin()
+    Items = [far.MenuItem("Item")]
+    DialogItems = [far.DialogText(1, 1, -1, "Text")]
+    Directory = far.PanelDirectory()
+    Commands = far.FileControlCommands
+    Names = ["File{0}".format(Index) for Index in range(100)]
+    Sizes = array("q", range(100))
+    FileTimes = array("q", range(133000000000000000, 133000000000000000 + 100 * 10000000, 10000000))
+    Host.ActivePanel.Items = [far.PluginPanelItem(FileName="File{0}".format(Index)) for Index in range(100)]
+
+    return {
+        "native.GetMsg": lambda: Natives["GetMsg"](Guid, 0),
+        "far.GetMsg": lambda: far.GetMsg(Guid, 0),
+        "far.Message": lambda: far.Message(Guid, Id, far.MessageFlags.Default, "", "Title", ["Line"], []),
+        "far.InputBox": lambda: far.InputBox(Guid, Id, "Title", "", "", "Text", 1024, "", far.InputBoxFlags.Default),
+        "far.DialogRun": lambda: far.DialogRun(Guid, Id, -1, -1, 70, 10, "", DialogItems, 0),
+        "far.Menu": lambda: far.Menu(Guid, Id, -1, -1, 0, far.MenuFlags.Default, "Title", "", "", [], [0], Items),
+        "far.ShowHelp": lambda: far.ShowHelp("", "Contents", far.HelpFlags.SelfHelp),
+        "far.AdvControl": lambda: far.AdvControl(Guid, far.AdvancedControlCommands.RedrawAll),
+        "native.PanelControl": lambda: Natives["PanelControl"](far.Panels.Active, Commands.GetPanelItem, 0, None),
+        "far.PanelControl": lambda: far.PanelControl(far.Panels.Active, Commands.GetPanelItem, 0),
+        "far.PanelControl(SetPanelDirectory)": lambda: far.PanelControl(far.Panels.Active, Commands.SetPanelDirectory, 0, Directory),
+        "far.Editor": lambda: far.Editor(Guid, "file", "", 0, 0, -1, -1, far.EditorFlags.Default, -1, -1, 65001),
+        "far.GetPanelItems(100)": lambda: far.GetPanelItems(far.Panels.Active, 0, 100),
+        "far.GetPanelItems(100, Fields)": lambda: far.GetPanelItems(far.Panels.Active, 0, 100, ("FileName", "FileSize")),
+        "far.PanelControl(GetPanelItem) x100": lambda: [far.PanelControl(far.Panels.Active, Commands.GetPanelItem, Index) for Index in range(100)],
+        "Plugin.GetMsg": lambda: Instance.GetMsg(0),
+        "Plugin.AdvControl": lambda: Instance.AdvControl(far.AdvancedControlCommands.RedrawAll),
+        "Plugin.Panel.PanelControl": lambda: Instance.ActivePanel.PanelControl(Commands.GetPanelItem, 0),
+        "new far.DialogItem": lambda: far.DialogItem(far.DialogItemType.TEXT, 1, 1, -1, 1, Data="Text"),
+        "new far.DialogText": lambda: far.DialogText(1, 1, -1, "Text"),
+        "new far.MenuItem": lambda: far.MenuItem("Item", far.MenuItemFlags.Default),
+        "new far.PluginPanelItem": lambda: far.PluginPanelItem(FileName="File", FileSize=1),
+        "new far.PluginPanelItem x100": lambda: [far.PluginPanelItem(FileName=Name, FileSize=1) for Name in Names],
+        "new far.FileTime": lambda: far.FileTime(133000000000000000),
+        "new far.LazyFileTime": lambda: far.LazyFileTime(133000000000000000),
+        "far.filetimes_to_datetimes(100)": lambda: far.filetimes_to_datetimes(FileTimes),
+        "far.PanelItemColumns.extend_columns(100)": lambda: far.PanelItemColumns().extend_columns(Names, FileSize=Sizes),
+    }
+
+def Run(Number: int = 100000, Repeat: int = 5) -> Dict[str, float]:
+    """Returns the best per-call time in nanoseconds for every case"""
+    with StubHost(Record=False) as Host:
+        Results = {}
+        for Name, Case in _cases(Host).items():
+            Best = min(timeit.repeat(Case, number=Number, repeat=Repeat))
+            Results[Name] = Best / Number * 1e9
+        return Results
+
+def Compare(Results: Dict[str, float], Baseline: Dict[str, float], Tolerance: float) -> List[str]:
+    return [Name for Name, Time in Results.items() if Name in Baseline and Time > Baseline[Name] * Tolerance]
+
+def main(Args: List[str] = None) -> int:
+    Parser = argparse.ArgumentParser(prog="python -m pygin.benchmark", description="pygin API dispatch microbenchmarks")
+    Parser.add_argument("--number", type=int, default=100000, help="calls per measurement")
+    Parser.add_argument("--repeat", type=int, default=5, help="measurements per case, the best one is reported")
+    Parser.add_argument("--json", help="write results to this file")
+    Parser.add_argument("--baseline", help="compare against results previously written with --json")
+    Parser.add_argument("--tolerance", type=float, default=1.25, help="allowed slowdown factor against the baseline")
+    Options = Parser.parse_args(Args)
+
+    Results = Run(Options.number, Options.repeat)
+    Width = max(map(len, Results))
+    for Name, Time in Results.items():
+        print("{0:<{1}} {2:10.1f} ns".format(Name, Width, Time))
+
+    if Options.json:
+        with open(Options.json, "w") as File:
+            json.dump(Results, File, indent=2)
+
+    if Options.baseline:
+        with open(Options.baseline) as File:
+            Regressions = Compare(Results, json.load(File), Options.tolerance)
+        for Name in Regressions:
+            print("Regression: {0}".format(Name))
+        return 1 if Regressions else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
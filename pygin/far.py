@@ -31,24 +31,54 @@ THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
 THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 """
 
+import collections.abc
 import datetime
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, fields
 import enum
+import functools
 import inspect
+import operator
 import sys
 import uuid
+from array import array
 from enum import unique
 from typing import *
 
-def __invoke_api():
-    Module = sys.modules[__name__]
-    Frame = sys._getframe(1)
-    CallerName = Frame.f_code.co_name
-    Args = inspect.getargvalues(Frame).locals
-    try:
-        return getattr(Module, "__" + CallerName)(*[Args[Arg] for Arg in inspect.getfullargspec(getattr(Module, CallerName)).args])
-    except AttributeError as e:
-        raise NameError("'{0}' cannot be called before plugin is loaded".format(CallerName))
+# Natives are injected by the host as module attributes named "__" + wrapper name.
+# Every wrapper below is compiled once into a direct forwarding call; its native
+# target is looked up on the first call and then stored in the wrapper namespace.
+_ApiTable = {}
+# Optional hook wrapping natives as they are resolved, see pygin.apistats
+_NativeWrapper = None
+
+def _api(Func):
+    Name = Func.__name__
+    Args = ", ".join(inspect.getfullargspec(Func).args)
+    Namespace = {}
+
+    def Resolve(*Args):
+        try:
+            Native = getattr(sys.modules[__name__], "__" + Name)
+        except AttributeError:
+            raise NameError("'{0}' cannot be called before plugin is loaded".format(Name)) from None
+        if _NativeWrapper is not None:
+            Native = _NativeWrapper(Name, Native)
+        Namespace["_native"] = Native
+        return Native(*Args)
+
+    Namespace["_native"] = Resolve
+    Namespace["_resolve"] = Resolve
+    exec("def {0}({1}):\n    return _native({1})\n".format(Name, Args), Namespace)
+    Wrapper = Namespace[Name]
+    Wrapper.__defaults__ = Func.__defaults__
+    functools.update_wrapper(Wrapper, Func)
+    _ApiTable[Name] = Namespace
+    return Wrapper
+
+def _unbind_api():
+    """Drops resolved natives so that the next call of every wrapper looks them up again"""
+    for Namespace in _ApiTable.values():
+        Namespace["_native"] = Namespace["_resolve"]
 
 def bit(n: int) -> int:
     return 1 << n
@@ -225,8 +255,9 @@ class ExitInfo:
     def __init__(self):
         pass
 
+@_api
 def GetMsg(PluginId: uuid, MsgId: int) -> str:
-    return __invoke_api()
+    ...
 
 @unique
 class MessageFlags(IntFlag):
@@ -242,8 +273,9 @@ class MessageFlags(IntFlag):
     ButtonYesNoCancel                               = bit(16) * 5
     ButtonRetryCancel                               = bit(16) * 6
 
+@_api
 def Message(PluginId: uuid, Id: uuid, Flags: MessageFlags, HelpTopic: str, Title: str, Items: list, Buttons: list) -> Union[int, None]:
-    return __invoke_api()
+    ...
 
 @unique
 class InputBoxFlags(IntFlag):
@@ -257,8 +289,9 @@ class InputBoxFlags(IntFlag):
     EditPath                                        = bit(6)
     EditPathExec                                    = bit(7)
 
+@_api
 def InputBox(PluginId: uuid, Id: uuid, Title: str, SubTitle: str, HistoryName: str, SrcText: str, DestSize: int, HelpTopic: str, Flags: InputBoxFlags) -> Union[str, None]:
-    return __invoke_api()
+    ...
 
 @unique
 class DialogItemType(IntFlag):
@@ -416,12 +449,13 @@ class DialogFlags(IntFlag):
     NoDrawPanel         = bit(3)
     KeepConsoleTitle    = bit(4)
 
+@_api
 def DialogRun(PluginId: uuid, Id: uuid,
               X1: int, Y1: int, X2: int, Y2: int,
               HelpTopic: str,
               Items: List[DialogItem],
               Flags: DialogFlags) -> int:
-    return __invoke_api()
+    ...
 
 @unique
 class MenuItemFlags(IntFlag):
@@ -454,8 +488,9 @@ class MenuFlags(IntFlag):
     ReverseAutohighlight                            = bit(3)
     ChangeConsoleTitle                              = bit(4)
 
+@_api
 def Menu(PluginId: uuid, Id: uuid, X: int, Y: int, MaxHeight: int, Flags: MenuFlags, Title: str, Bottom: str, HelpTopic: str, BreakKeys: list, BreakCode, Items: list) -> Union[int, None]:
-    return __invoke_api()
+    ...
 
 @unique
 class HelpFlags(IntFlag):
@@ -470,8 +505,9 @@ class HelpFlags(IntFlag):
     UseContents = bit(30)
     NoShowError = bit(31)
 
+@_api
 def ShowHelp(ModuleName: str, HelpTopic: str, Flags: HelpFlags) -> bool:
-    return __invoke_api()
+    ...
 
 @unique
 class AdvancedControlCommands(IntEnum):
@@ -496,6 +532,24 @@ class AdvancedControlCommands(IntEnum):
     ProgressNotify                                  = 27
     GetWindowType                                   = 28
 
+@unique
+class TaskbarProgressState(IntEnum):
+    NoProgress                                      = 0
+    Indeterminate                                   = 1
+    Normal                                          = 2
+    Error                                           = 4
+    Paused                                          = 8
+
+class ProgressValue:
+    def __init__(self, Completed: int = 0, Total: int = 100):
+        self.Completed = Completed
+        self.Total = Total
+
+class ProcessSynchroEventInfo:
+    def __init__(self):
+        self.Event = 0
+        self.Param = None
+
 @unique
 class WindowInfoType(IntEnum):
     Unknown                                         = -1
@@ -512,8 +566,9 @@ class WindowType:
     def __init__(self):
         self.Type = WindowInfoType.Unknown
 
+@_api
 def AdvControl(PluginId: uuid, Command: AdvancedControlCommands, Param1: int = 0, Param2 = None):
-    return __invoke_api()
+    ...
 
 @unique
 class FileControlCommands(IntEnum):
@@ -632,13 +687,71 @@ class PanelInfo:
 
 _EPOCH_AS_FILETIME = 116444736000000000  # January 1, 1970 as MS file time
 _HUNDREDS_OF_NANOSECONDS = 10000000
+_EPOCH = datetime.datetime(1970, 1, 1)
+
+# FILETIME values are converted with integer arithmetic only, earlier values are clamped to the epoch as before
+def _filetime_to_datetime(Value: int) -> datetime.datetime:
+    if Value <= _EPOCH_AS_FILETIME:
+        return _EPOCH
+    Seconds, Ticks = divmod(Value - _EPOCH_AS_FILETIME, _HUNDREDS_OF_NANOSECONDS)
+    return _EPOCH + datetime.timedelta(0, Seconds, Ticks // 10)
+
+def _datetime_to_filetime(Value: datetime.datetime) -> int:
+    # naive values are UTC
+    if Value.tzinfo is not None:
+        Value = Value.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    Delta = Value - _EPOCH
+    return (Delta.days * 86400 + Delta.seconds) * _HUNDREDS_OF_NANOSECONDS + Delta.microseconds * 10 + _EPOCH_AS_FILETIME
 
 class FileTime(datetime.datetime):
     def __new__(self, Value = 0):
-        return datetime.datetime.utcfromtimestamp((max(Value, _EPOCH_AS_FILETIME) - _EPOCH_AS_FILETIME) / _HUNDREDS_OF_NANOSECONDS)
+        return _filetime_to_datetime(Value)
 
     def value(self):
-        return int(self.replace(tzinfo=datetime.timezone.utc).timestamp() * _HUNDREDS_OF_NANOSECONDS + _EPOCH_AS_FILETIME)
+        return _datetime_to_filetime(self)
+
+class LazyFileTime(int):
+    """
+    Raw FILETIME value (100ns ticks since January 1, 1601 UTC) without precision loss.
+    The datetime is built on first access of DateTime or of any datetime attribute.
+    """
+    def value(self) -> int:
+        return int(self)
+
+    @property
+    def DateTime(self) -> datetime.datetime:
+        try:
+            return self.__dict__["_DateTime"]
+        except KeyError:
+            Value = self.__dict__["_DateTime"] = _filetime_to_datetime(self)
+            return Value
+
+    def __getattr__(self, Name):
+        if Name.startswith("__"):
+            raise AttributeError(Name)
+        return getattr(self.DateTime, Name)
+
+    def __repr__(self):
+        return "LazyFileTime({0})".format(int(self))
+
+def filetimes_to_datetimes(Values: Union[Iterable[int], bytes, memoryview]) -> List[datetime.datetime]:
+    """Converts raw FILETIME values, e.g. array('q') or a buffer of little-endian int64, to datetimes"""
+    if isinstance(Values, (bytes, bytearray, memoryview)):
+        Values = memoryview(Values).cast("B").cast("q")
+    Epoch, EpochAsFileTime, Ticks, Delta = _EPOCH, _EPOCH_AS_FILETIME, _HUNDREDS_OF_NANOSECONDS, datetime.timedelta
+    Result = []
+    Append = Result.append
+    for Value in Values:
+        if Value <= EpochAsFileTime:
+            Append(Epoch)
+        else:
+            Seconds, Rest = divmod(Value - EpochAsFileTime, Ticks)
+            Append(Epoch + Delta(0, Seconds, Rest // 10))
+    return Result
+
+def datetimes_to_filetimes(Values: Iterable[datetime.datetime]) -> array:
+    """Converts datetimes (naive ones are UTC) to raw FILETIME values"""
+    return array("q", map(_datetime_to_filetime, Values))
 
 @unique
 class PluginPanelItemFlags(IntFlag):
@@ -666,6 +779,109 @@ class PluginPanelItem:
     CRC32: int = 0
     #Reserved
 
+def _filetime_value(Value: Union[int, datetime.datetime]) -> int:
+    return Value if isinstance(Value, int) else _datetime_to_filetime(Value)
+
+class PanelItemColumns(collections.abc.Sequence):
+    """
+    Struct-of-arrays storage of plugin panel items, an alternative to a list of PluginPanelItem
+    for GetFindDataInfo.PanelItems.
+    Strings are kept in lists, numbers and raw FILETIME values in array('q') columns named
+    as the PluginPanelItem fields. CustomColumnData is stored only for the rows that have it.
+    Indexing and iteration build PluginPanelItem objects on demand.
+    """
+    _StringColumns = ("FileName", "AlternateFileName", "Description", "Owner")
+    _TimeColumns = ("CreationTime", "LastAccessTime", "LastWriteTime", "ChangeTime")
+    _IntegerColumns = _TimeColumns + ("FileSize", "AllocationSize", "Flags", "FileAttributes", "NumberOfLinks", "CRC32")
+
+    def __init__(self, Items: Iterable[PluginPanelItem] = ()):
+        for Name in self._StringColumns:
+            setattr(self, Name, [])
+        for Name in self._IntegerColumns:
+            setattr(self, Name, array("q"))
+        # {row: [Any, ...]}
+        self.CustomColumnData = {}
+        self.extend(Items)
+
+    def __len__(self) -> int:
+        return len(self.FileName)
+
+    def __getitem__(self, Index):
+        if isinstance(Index, slice):
+            return [self[Row] for Row in range(*Index.indices(len(self)))]
+        if Index < 0:
+            Index += len(self)
+        if not 0 <= Index < len(self):
+            raise IndexError("PanelItemColumns index out of range")
+        Item = PluginPanelItem(
+            CreationTime=_filetime_to_datetime(self.CreationTime[Index]),
+            LastAccessTime=_filetime_to_datetime(self.LastAccessTime[Index]),
+            LastWriteTime=_filetime_to_datetime(self.LastWriteTime[Index]),
+            ChangeTime=_filetime_to_datetime(self.ChangeTime[Index]),
+            FileSize=self.FileSize[Index],
+            FileName=self.FileName[Index],
+            AlternateFileName=self.AlternateFileName[Index],
+            Description=self.Description[Index],
+            Owner=self.Owner[Index],
+            CustomColumnData=list(self.CustomColumnData.get(Index, ())),
+            Flags=PluginPanelItemFlags(self.Flags[Index]),
+            FileAttributes=self.FileAttributes[Index],
+            NumberOfLinks=self.NumberOfLinks[Index],
+            CRC32=self.CRC32[Index])
+        Item.AllocationSize = self.AllocationSize[Index]
+        return Item
+
+    def append(self, Item: PluginPanelItem = None, **Fields):
+        """Adds a PluginPanelItem or a row given as PluginPanelItem field values, times may be raw FILETIME values"""
+        if Item is not None:
+            Fields = {Name: getattr(Item, Name) for Name in self._StringColumns + self._IntegerColumns}
+            Fields["CustomColumnData"] = Item.CustomColumnData
+        # convert every value first so that a bad one leaves the container untouched
+        Integers = array("q", [_filetime_value(Fields.get(Name, 0)) for Name in self._TimeColumns] +
+                         [Fields.get(Name, 0) for Name in self._IntegerColumns[len(self._TimeColumns):]])
+        CustomColumnData = list(Fields.get("CustomColumnData") or ())
+        Row = len(self)
+        for Name in self._StringColumns:
+            getattr(self, Name).append(Fields.get(Name, ""))
+        for Name, Value in zip(self._IntegerColumns, Integers):
+            getattr(self, Name).append(Value)
+        if CustomColumnData:
+            self.CustomColumnData[Row] = CustomColumnData
+
+    def extend(self, Items: Iterable[PluginPanelItem]):
+        for Item in Items:
+            self.append(Item)
+
+    def extend_columns(self, FileName: Sequence[str], **Columns):
+        """
+        Adds rows in bulk: FileName and every other given column are sequences of equal length,
+        times are raw FILETIME values, missing columns are filled with defaults
+        """
+        Count = len(FileName)
+        Unknown = set(Columns) - set(self._StringColumns + self._IntegerColumns) - {"CustomColumnData"}
+        if Unknown:
+            raise ValueError("Unknown PluginPanelItem fields: {0}".format(sorted(Unknown)))
+        if any(len(Column) != Count for Column in Columns.values() if not isinstance(Column, dict)):
+            raise ValueError("All columns must have the same length")
+        # build every column first so that a bad value leaves the container untouched
+        Strings = {"FileName": list(FileName)}
+        for Name in self._StringColumns[1:]:
+            Strings[Name] = list(Columns.get(Name, ("",) * Count))
+        Integers = {}
+        for Name in self._IntegerColumns:
+            Column = Columns.get(Name)
+            Integers[Name] = array("q", [0]) * Count if Column is None else array("q", Column)
+        Row = len(self)
+        # either a sequence with one value list per row or {row in this batch: values}
+        CustomColumnData = Columns.get("CustomColumnData", {})
+        Rows = CustomColumnData.items() if isinstance(CustomColumnData, dict) else enumerate(CustomColumnData)
+        CustomColumnData = {Row + Index: list(Data) for Index, Data in Rows if Data}
+        for Name, Column in Strings.items():
+            getattr(self, Name).extend(Column)
+        for Name, Column in Integers.items():
+            getattr(self, Name).extend(Column)
+        self.CustomColumnData.update(CustomColumnData)
+
 class PanelDirectory:
     def __init__(self):
         self.Name = ""
@@ -683,12 +899,46 @@ class CmdLineSelect:
         self.SelStart = 0
         self.SelEnd = 0
 
+@_api
 def PanelControl(Panel: int, Command: FileControlCommands, Param1: int = 0, Param2 = None):
-    return __invoke_api()
+    ...
+
+# Natives the host may not provide; their wrappers fall back to Python implementations
+_OptionalApi = ["GetPanelItems"]
+
+def _panel_item_getter(Fields: Sequence[str]) -> Union[Callable[[PluginPanelItem], tuple], None]:
+    if Fields is None:
+        return None
+    Known = {Field.name for Field in fields(PluginPanelItem)} | {"AllocationSize"}
+    Unknown = [Name for Name in Fields if Name not in Known]
+    if Unknown or not Fields:
+        raise ValueError("Unknown PluginPanelItem fields: {0}".format(Unknown))
+    if len(Fields) == 1:
+        Getter = operator.attrgetter(Fields[0])
+        return lambda Item: (Getter(Item),)
+    return operator.attrgetter(*Fields)
+
+def GetPanelItems(Panel: int, Start: int = 0, Count: int = None, Fields: Sequence[str] = None, Selected: bool = False) -> list:
+    """
+    Reads Count items (all remaining ones if None) of the panel, or of its selection if Selected, starting from Start.
+    Returns PluginPanelItem objects, or tuples of the requested Fields in the given order.
+    Uses a single host call if the host supports it, otherwise one PanelControl call per item.
+    """
+    Getter = _panel_item_getter(Fields)
+    Native = getattr(sys.modules[__name__], "__GetPanelItems", None)
+    if Native is not None:
+        return Native(Panel, Start, Count, Fields, Selected)
+
+    Info = PanelControl(Panel, FileControlCommands.GetPanelInfo)
+    Total = Info.SelectedItemsNumber if Selected else Info.ItemsNumber
+    Stop = Total if Count is None else min(Total, Start + Count)
+    Command = FileControlCommands.GetSelectedPanelItem if Selected else FileControlCommands.GetPanelItem
+    Items = [PanelControl(Panel, Command, Index) for Index in range(Start, Stop)]
+    return Items if Getter is None else [Getter(Item) for Item in Items]
 
 class GetFindDataInfo:
     def __init__(self):
-        self.PanelItems: List[PluginPanelItem] = []
+        self.PanelItems: Union[List[PluginPanelItem], PanelItemColumns] = []
         self.OpMode = OperationModes.Default
 
 @dataclass
@@ -729,5 +979,6 @@ class EditorExitCode(IntEnum):
     EEC_NOT_MODIFIED        = 2
     EEC_LOADING_INTERRUPTED = 3
 
+@_api
 def Editor(PluginId: uuid, FileName: str, Title: str, X1: int, Y1: int, X2: int, Y2: int, Flags: EditorFlags, StartLine: int, StartChar: int, CodePage: int) -> int:
-    return __invoke_api()
+    ...
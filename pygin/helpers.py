@@ -31,17 +31,72 @@ THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
 THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 """
 
+import os
+import queue
+import sys
+import threading
+import time
 from functools import partial
+from typing import *
 from pygin import far
 
+if sys.platform == "win32":
+    import ctypes
+
+    # Far changes its environment after Python has copied it into os.environ
+    def _far_language() -> str:
+        Buffer = ctypes.create_unicode_buffer(64)
+        ctypes.windll.kernel32.GetEnvironmentVariableW("FARLANG", Buffer, len(Buffer))
+        return Buffer.value
+else:
+    def _far_language() -> str:
+        return os.environ.get("FARLANG", "")
+
+class MessageCache:
+    """
+    GetMsg replacement serving messages from memory.
+    Each message is requested from Far once per interface language;
+    the language (FARLANG) is rechecked at most every LanguageCheckInterval seconds.
+    """
+    LanguageCheckInterval = 1.0
+
+    def __init__(self, PluginId):
+        self.PluginId = PluginId
+        self.Language = None
+        self.Checked = 0.0
+        self.Messages = {}
+
+    def __call__(self, MsgId: int) -> str:
+        Now = time.monotonic()
+        if Now - self.Checked >= self.LanguageCheckInterval:
+            self.Checked = Now
+            Language = _far_language()
+            if Language != self.Language:
+                self.Language = Language
+                self.Messages = {}
+        try:
+            return self.Messages[MsgId]
+        except KeyError:
+            Message = self.Messages[MsgId] = far.GetMsg(self.PluginId, MsgId)
+            return Message
+
+    def Preload(self, Ids: Iterable[int]) -> Dict[int, str]:
+        """Loads all the given ids (e.g. an IntEnum) at once, returns {id: message}"""
+        return {Id: self(Id) for Id in Ids}
+
+    def Invalidate(self):
+        self.Messages = {}
+
 class Plugin:
     class Panel:
         def __init__(self, PanelId):
             self.PanelId = PanelId
             self.PanelControl = partial(far.PanelControl, self.PanelId)
+            self.GetItems = partial(far.GetPanelItems, self.PanelId)
+            self.GetSelectedItems = partial(far.GetPanelItems, self.PanelId, Selected=True)
 
     def __init__(self):
-        self.GetMsg = partial(far.GetMsg, self.Guid)
+        self.GetMsg = MessageCache(self.Guid)
         self.Message = partial(far.Message, self.Guid)
         self.InputBox = partial(far.InputBox, self.Guid)
         self.DialogRun= partial(far.DialogRun, self.Guid)
@@ -51,6 +106,23 @@ class Plugin:
         self.ActivePanel = self.Panel(far.Panels.Active)
         self.PassivePanel = self.Panel(far.Panels.Passive)
         self.Editor = partial(far.Editor, self.Guid)
+        self._SynchroQueue = queue.SimpleQueue()
+
+    def Synchro(self, Callback: Callable[[], None]):
+        """
+        Runs Callback in the Far main thread from ProcessSynchroEventW.
+        Can be called from any thread.
+        """
+        self._SynchroQueue.put(Callback)
+        self.AdvControl(far.AdvancedControlCommands.Synchro)
+
+    def ProcessSynchroEventW(self, Info: far.ProcessSynchroEventInfo):
+        while True:
+            try:
+                Callback = self._SynchroQueue.get_nowait()
+            except queue.Empty:
+                break
+            Callback()
 
 class Console:
     def __enter__(self):
@@ -61,3 +133,136 @@ class Console:
 
     def __cmd(self, Command):
         far.PanelControl(far.Panels.Active, Command)
+
+class PagedFindData:
+    """
+    Progressive GetFindData for plugin panels over large or slow listings.
+
+    Source is called in a background thread and yields chunks (iterables) of PluginPanelItem.
+    The first GetFindData call starts it and returns whatever arrived within FirstChunkTimeout;
+    every further chunk is handed to the main thread via Plugin.Synchro, which updates the Far
+    taskbar progress (from Total, if known) and the plugin panel, so that Far calls GetFindData again.
+    Calls with OperationModes.Find wait for the complete listing.
+
+    Usage:
+        def OpenW(self, Info):
+            self.Listing = PagedFindData(self, lambda: read_listing_in_chunks(...))
+        def GetFindDataW(self, Info):
+            return self.Listing.GetFindData(Info)
+        def ClosePanelW(self, Info):
+            self.Listing.Cancel()
+    """
+
+    def __init__(self, Plugin: Plugin, Source: Callable[[], Iterable[Iterable[far.PluginPanelItem]]],
+                 Total: int = None, FirstChunkTimeout: float = 0.1, Container: Callable[[], Any] = list):
+        self.Plugin = Plugin
+        self.Source = Source
+        self.Total = Total
+        self.FirstChunkTimeout = FirstChunkTimeout
+        self.Container = Container
+        self.Error = None
+        self.__lock = threading.Lock()
+        self.__thread = None
+        self.Reset()
+
+    def Reset(self):
+        """Cancels the current listing, the next GetFindData call starts over"""
+        if self.__thread is not None:
+            self.Cancel()
+        with self.__lock:
+            self.Items = self.Container()
+            self.Done = False
+            self.Error = None
+            self.__pending = []
+            self.__scheduled = False
+            self.__cancelled = threading.Event()
+            self.__first_chunk = threading.Event()
+            self.__thread = None
+
+    @property
+    def Cancelled(self) -> bool:
+        return self.__cancelled.is_set()
+
+    def Cancel(self):
+        """Stops reading the source; items received so far are kept"""
+        if not self.__cancelled.is_set():
+            self.__cancelled.set()
+            if self.__thread is not None and not self.Done:
+                self.Plugin.AdvControl(far.AdvancedControlCommands.SetProgressState, far.TaskbarProgressState.NoProgress)
+
+    def GetFindData(self, Info: far.GetFindDataInfo) -> bool:
+        if self.__thread is None:
+            self.__thread = threading.Thread(target=self.__run, name="PagedFindData", daemon=True,
+                                             args=(self.__cancelled, self.__pending, self.__first_chunk))
+            self.__thread.start()
+            self.__first_chunk.wait(self.FirstChunkTimeout)
+        if Info.OpMode & far.OperationModes.Find:
+            self.__thread.join()
+        self.__merge()
+        Info.PanelItems = self.Items
+        return True
+
+    def __merge(self) -> bool:
+        with self.__lock:
+            Pending = self.__pending[:]
+            del self.__pending[:]
+            self.__scheduled = False
+        for Chunk in Pending:
+            self.Items.extend(Chunk)
+        return bool(Pending)
+
+    def __post(self):
+        with self.__lock:
+            if self.__scheduled:
+                return
+            self.__scheduled = True
+        self.Plugin.Synchro(self.__update)
+
+    def __run(self, Cancelled: threading.Event, Pending: list, FirstChunk: threading.Event):
+        # Cancelled, Pending and FirstChunk belong to this run only: after Reset the
+        # attributes are replaced, and a stale run must not feed the new listing.
+        Chunks = None
+        try:
+            Chunks = iter(self.Source())
+            for Chunk in Chunks:
+                Chunk = list(Chunk)
+                with self.__lock:
+                    if Cancelled.is_set():
+                        break
+                    Pending.append(Chunk)
+                FirstChunk.set()
+                self.__post()
+        except Exception as e:
+            with self.__lock:
+                if Cancelled is self.__cancelled:
+                    self.Error = e
+        finally:
+            if hasattr(Chunks, "close"):
+                Chunks.close()
+            with self.__lock:
+                Current = Cancelled is self.__cancelled
+                if Current:
+                    self.Done = True
+            FirstChunk.set()
+            if Current:
+                self.__post()
+
+    def __update(self):
+        if self.__cancelled.is_set():
+            return
+        Changed = self.__merge()
+        Commands = far.AdvancedControlCommands
+        if self.Done:
+            self.Plugin.AdvControl(Commands.SetProgressState, far.TaskbarProgressState.NoProgress)
+        elif self.Total:
+            self.Plugin.AdvControl(Commands.SetProgressState, far.TaskbarProgressState.Normal)
+            self.Plugin.AdvControl(Commands.SetProgressValue, 0, far.ProgressValue(min(len(self.Items), self.Total), self.Total))
+        else:
+            self.Plugin.AdvControl(Commands.SetProgressState, far.TaskbarProgressState.Indeterminate)
+        if Changed:
+            for Panel in (self.Plugin.ActivePanel, self.Plugin.PassivePanel):
+                Info = Panel.PanelControl(far.FileControlCommands.GetPanelInfo)
+                if Info.Flags & far.PanelInfoFlags.Plugin and Info.OwnerGuid == self.Plugin.Guid:
+                    Panel.PanelControl(far.FileControlCommands.UpdatePanel, 1)
+                    Panel.PanelControl(far.FileControlCommands.RedrawPanel)
+                    break
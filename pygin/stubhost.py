@@ -0,0 +1,185 @@
+﻿"""
+Headless stand-in for the Far host
+"""
+"""
+stubhost.py
+"""
+"""
+Copyright 2017 Alex Alabuzhev
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions
+are met:
+1. Redistributions of source code must retain the above copyright
+   notice, this list of conditions and the following disclaimer.
+2. Redistributions in binary form must reproduce the above copyright
+   notice, this list of conditions and the following disclaimer in the
+   documentation and/or other materials provided with the distribution.
+3. The name of the authors may not be used to endorse or promote products
+   derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE AUTHOR ``AS IS'' AND ANY EXPRESS OR
+IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES
+OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR ANY DIRECT, INDIRECT,
+INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT
+NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF
+THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+import uuid
+from typing import *
+
+from pygin import far
+
+class StubPanel:
+    def __init__(self, Items: List[far.PluginPanelItem] = None, Directory: str = ""):
+        self.Items = Items if Items is not None else []
+        self.Directory = Directory
+        self.CurrentItem = 0
+        self.TopPanelItem = 0
+        self.Flags = far.PanelInfoFlags.Visible
+        self.PanelType = far.PanelInfoType.FilePanel
+        self.OwnerGuid = far.NullUuid
+
+    def Selected(self) -> List[far.PluginPanelItem]:
+        return [Item for Item in self.Items if Item.Flags & far.PluginPanelItemFlags.Selected]
+
+    def Info(self) -> far.PanelInfo:
+        Info = far.PanelInfo()
+        Info.Flags = self.Flags
+        Info.ItemsNumber = len(self.Items)
+        Info.SelectedItemsNumber = len(self.Selected())
+        Info.CurrentItem = self.CurrentItem
+        Info.TopPanelItem = self.TopPanelItem
+        Info.PanelType = self.PanelType
+        Info.OwnerGuid = self.OwnerGuid
+        if self.OwnerGuid != far.NullUuid:
+            Info.Flags |= far.PanelInfoFlags.Plugin
+        return Info
+
+class StubHost:
+    """
+    Injects pure-Python implementations of all far natives, so that pygin and
+    plugins built on it can run without Far Manager (e.g. on Linux CI boxes).
+
+    Optional natives (far._OptionalApi) are only injected if Optional is True,
+    which allows exercising both the bulk and the fallback code paths.
+
+    Every call is recorded in Calls as (Name, Args) unless Record is False.
+    Results are scripted per native with Script(); unscripted calls get
+    a plausible default answer, see the _Default* methods.
+    """
+
+    def __init__(self, Record: bool = True, Optional: bool = True):
+        self.Record = Record
+        self.Optional = Optional
+        self.Calls: List[Tuple[str, tuple]] = []
+        self.Scripts: Dict[str, Callable] = {}
+        self.Messages: Dict[int, str] = {}
+        self.ActivePanel = StubPanel()
+        self.PassivePanel = StubPanel()
+        self.Installed = False
+
+    def Script(self, Name: str, Result):
+        """Scripts a native: Result is either a callable taking the native arguments or a constant"""
+        self.Scripts[Name] = Result if callable(Result) else (lambda *Args: Result)
+
+    def Natives(self) -> Dict[str, Callable]:
+        Names = list(far._ApiTable) + (far._OptionalApi if self.Optional else [])
+        return {Name: self.__native(Name) for Name in Names}
+
+    def Install(self):
+        for Name, Native in self.Natives().items():
+            setattr(far, "__" + Name, Native)
+        far._unbind_api()
+        self.Installed = True
+
+    def Uninstall(self):
+        for Name in list(far._ApiTable) + far._OptionalApi:
+            if hasattr(far, "__" + Name):
+                delattr(far, "__" + Name)
+        far._unbind_api()
+        self.Installed = False
+
+    def __enter__(self):
+        self.Install()
+        return self
+
+    def __exit__(self, *args):
+        self.Uninstall()
+
+    def CallsOf(self, Name: str) -> List[tuple]:
+        return [Args for CallName, Args in self.Calls if CallName == Name]
+
+    def __native(self, Name: str) -> Callable:
+        Default = getattr(self, "_Default" + Name)
+
+        def Native(*Args):
+            if self.Record:
+                self.Calls.append((Name, Args))
+            Scripted = self.Scripts.get(Name)
+            return Scripted(*Args) if Scripted is not None else Default(*Args)
+
+        Native.__name__ = "__" + Name
+        return Native
+
+    def Panel(self, Panel: int) -> StubPanel:
+        return self.PassivePanel if Panel == far.Panels.Passive else self.ActivePanel
+
+    def _DefaultGetMsg(self, PluginId: uuid.UUID, MsgId: int) -> str:
+        return self.Messages.get(MsgId, "Msg{0}".format(int(MsgId)))
+
+    def _DefaultMessage(self, PluginId, Id, Flags, HelpTopic, Title, Items, Buttons):
+        return 0
+
+    def _DefaultInputBox(self, PluginId, Id, Title, SubTitle, HistoryName, SrcText, DestSize, HelpTopic, Flags):
+        return SrcText
+
+    def _DefaultDialogRun(self, PluginId, Id, X1, Y1, X2, Y2, HelpTopic, Items, Flags):
+        return -1
+
+    def _DefaultMenu(self, PluginId, Id, X, Y, MaxHeight, Flags, Title, Bottom, HelpTopic, BreakKeys, BreakCode, Items):
+        return None
+
+    def _DefaultShowHelp(self, ModuleName, HelpTopic, Flags):
+        return True
+
+    def _DefaultAdvControl(self, PluginId, Command, Param1=0, Param2=None):
+        return 0
+
+    def _DefaultEditor(self, PluginId, FileName, Title, X1, Y1, X2, Y2, Flags, StartLine, StartChar, CodePage):
+        return far.EditorExitCode.EEC_NOT_MODIFIED
+
+    def _DefaultPanelControl(self, Panel, Command, Param1=0, Param2=None):
+        Target = self.Panel(Panel)
+        Commands = far.FileControlCommands
+        if Command == Commands.GetPanelInfo:
+            return Target.Info()
+        if Command == Commands.GetPanelItem:
+            return Target.Items[Param1]
+        if Command == Commands.GetSelectedPanelItem:
+            return Target.Selected()[Param1]
+        if Command == Commands.GetCurrentPanelItem:
+            return Target.Items[Target.CurrentItem] if Target.Items else None
+        if Command == Commands.GetPanelDirectory:
+            Directory = far.PanelDirectory()
+            Directory.Name = Target.Directory
+            return Directory
+        if Command == Commands.SetPanelDirectory:
+            Target.Directory = Param2.Name
+            return True
+        if Command == Commands.IsActivePanel:
+            return Target is self.ActivePanel
+        return True
+
+    def _DefaultGetPanelItems(self, Panel, Start, Count, Fields, Selected):
+        Target = self.Panel(Panel)
+        Items = Target.Selected() if Selected else Target.Items
+        Items = Items[Start:] if Count is None else Items[Start:Start + Count]
+        Getter = far._panel_item_getter(Fields)
+        return Items if Getter is None else [Getter(Item) for Item in Items]